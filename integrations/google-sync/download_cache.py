@@ -0,0 +1,142 @@
+"""
+Local spool of downloaded files for queued uploads.
+Lets retries of failed uploads skip downloading the file from Google again.
+"""
+
+import os
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional, BinaryIO, Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCache:
+    """Size-bounded on-disk cache of downloaded files, keyed by Google ID and checksum.
+    
+    Entries are evicted least recently used first, by access time.
+    """
+    
+    def __init__(self, cache_dir: str = "download_cache", max_bytes: int = 10 * 1024 ** 3):
+        """Initialize the cache.
+        
+        Args:
+            cache_dir: Directory holding cached files (created on first use)
+            max_bytes: Maximum total size of cached files
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+    
+    def _path(self, google_id: str, checksum: Optional[str]) -> Path:
+        return self.cache_dir / f"{google_id}.{checksum or 'any'}.bin"
+    
+    def _entries(self, google_id: str) -> List[Path]:
+        if not self.cache_dir.is_dir():
+            return []
+        return list(self.cache_dir.glob(f"{google_id}.*.bin"))
+    
+    def open(self, google_id: str, checksum: Optional[str] = None) -> Optional[BinaryIO]:
+        """Open a cached file.
+        
+        Args:
+            google_id: Google file or media item ID
+            checksum: Content checksum the cached copy must match, if known
+        
+        Returns:
+            Open binary file, or None if not cached
+        """
+        path = self._path(google_id, checksum)
+        try:
+            # Refresh the access time explicitly; it is not updated on noatime mounts
+            os.utime(path)
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        
+        logger.debug(f"Using cached download for {google_id}")
+        return file
+    
+    def fill(self, google_id: str, checksum: Optional[str],
+             download: Callable[[str], None]) -> BinaryIO:
+        """Download a file into the cache and open it.
+        
+        Stale copies with a different checksum are removed.
+        
+        Args:
+            google_id: Google file or media item ID
+            checksum: Content checksum of the file, if known
+            download: Callable writing the file contents to the given path
+        
+        Returns:
+            Open binary file
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.discard(google_id)
+        
+        path = self._path(google_id, checksum)
+        partial_path = path.with_suffix('.part')
+        try:
+            download(str(partial_path))
+            os.replace(partial_path, path)
+        finally:
+            if partial_path.exists():
+                partial_path.unlink()
+        
+        # Keep the new entry even if it alone exceeds the limit
+        self._evict(keep=path)
+        return open(path, 'rb')
+    
+    def store(self, google_id: str, checksum: Optional[str], stream: BinaryIO) -> BinaryIO:
+        """Write an already downloaded stream into the cache and open the copy.
+        
+        Args:
+            google_id: Google file or media item ID
+            checksum: Content checksum of the file, if known
+            stream: Downloaded file contents; closed once copied
+        
+        Returns:
+            Open binary file
+        """
+        def copy(dest_path: str):
+            with open(dest_path, 'wb') as dest_file:
+                shutil.copyfileobj(stream, dest_file)
+        
+        try:
+            return self.fill(google_id, checksum, copy)
+        finally:
+            stream.close()
+    
+    def discard(self, google_id: str):
+        """Remove all cached copies of a file.
+        
+        Args:
+            google_id: Google file or media item ID
+        """
+        for path in self._entries(google_id):
+            path.unlink(missing_ok=True)
+    
+    def _evict(self, keep: Path):
+        """Remove least recently used entries until the cache fits max_bytes.
+        
+        Args:
+            keep: Entry that must not be evicted
+        """
+        entries = []
+        total_bytes = 0
+        for path in self.cache_dir.glob("*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total_bytes += stat.st_size
+        
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            logger.debug(f"Evicted cached download {path.name}")
@@ -0,0 +1,122 @@
+"""
+Shared Google OAuth2 authentication for the sync integrations.
+Loads, refreshes and caches credentials so several API clients can share them.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, FrozenSet, Iterable, Set, Tuple
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleAuth:
+    """Process-wide cache of Google OAuth2 credentials.
+    
+    Credentials are keyed by OAuth client file and granted scopes. A request
+    for a subset of already granted scopes reuses the cached credentials, so
+    clients constructed with the union of their scopes share one OAuth flow
+    and one token load. Clients sharing credentials this way share one token:
+    it is saved to every token file they were given, including after a refresh.
+    """
+    
+    # (client file, granted scopes) -> (credentials, token files holding them)
+    _cache: Dict[Tuple[str, FrozenSet[str]], Tuple[Credentials, Set[str]]] = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get(cls, credentials_path: str, token_path: str, scopes: Iterable[str]) -> Credentials:
+        """Get valid credentials covering the requested scopes.
+        
+        Args:
+            credentials_path: Path to OAuth2 credentials file
+            token_path: Path to store/load access token
+            scopes: OAuth2 scopes required by the caller
+        
+        Returns:
+            Valid Google credentials
+        """
+        scopes = frozenset(scopes)
+        
+        with cls._lock:
+            for (cached_path, granted), (creds, token_paths) in cls._cache.items():
+                if cached_path == credentials_path and scopes <= granted:
+                    if creds.expired and creds.refresh_token:
+                        logger.info("Refreshing cached Google credentials")
+                        creds.refresh(Request())
+                        token_paths.add(token_path)
+                        for path in token_paths:
+                            cls._save(creds, path)
+                    elif token_path not in token_paths:
+                        token_paths.add(token_path)
+                        cls._save(creds, token_path)
+                    return creds
+            
+            creds = cls._load(credentials_path, token_path, sorted(scopes))
+            cls._cache[(credentials_path, frozenset(creds.scopes or scopes))] = (creds, {token_path})
+            return creds
+    
+    @classmethod
+    def clear(cls):
+        """Forget all cached credentials."""
+        with cls._lock:
+            cls._cache.clear()
+    
+    @staticmethod
+    def _load(credentials_path: str, token_path: str, scopes: list) -> Credentials:
+        """Load credentials from disk, refreshing or re-authorizing as needed.
+        
+        Args:
+            credentials_path: Path to OAuth2 credentials file
+            token_path: Path to store/load access token
+            scopes: OAuth2 scopes to request
+        
+        Returns:
+            Valid Google credentials
+        """
+        creds = None
+        
+        # Load existing token if available and it grants every requested scope
+        if os.path.exists(token_path):
+            creds = Credentials.from_authorized_user_file(token_path)
+            if not creds.has_scopes(scopes):
+                logger.info(f"Token {token_path} lacks required scopes; re-authorizing")
+                creds = None
+        
+        # If no valid credentials, authenticate
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                logger.info("Refreshing Google credentials")
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(credentials_path):
+                    raise FileNotFoundError(
+                        f"Credentials file not found: {credentials_path}\n"
+                        "Please download OAuth2 credentials from Google Cloud Console"
+                    )
+                
+                logger.info(f"Starting OAuth2 flow for scopes: {', '.join(scopes)}")
+                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, scopes)
+                creds = flow.run_local_server(port=0)
+            
+            # Save credentials for future use
+            GoogleAuth._save(creds, token_path)
+        
+        return creds
+    
+    @staticmethod
+    def _save(creds: Credentials, token_path: str):
+        """Save credentials to a token file.
+        
+        Args:
+            creds: Credentials to save
+            token_path: Path to store the access token
+        """
+        with open(token_path, 'w') as token:
+            token.write(creds.to_json())
+        logger.info(f"Saved credentials to {token_path}")
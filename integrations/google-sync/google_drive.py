@@ -3,158 +3,535 @@ Google Drive integration for syncing files to Silo.
 Handles authentication, file listing, and downloading from Google Drive.
 """
 
+import hashlib
 import io
+import itertools
+import json
 import logging
 import os
-from typing import Optional, List, Dict, Any, Generator
+import queue
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any, BinaryIO, Callable, Generator, Iterable, Iterator, Tuple
 from pathlib import Path
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
+import httplib2
+from cachetools import TTLCache
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 from googleapiclient.errors import HttpError
 
+from google_auth import GoogleAuth
+
 logger = logging.getLogger(__name__)
 
 # Google Drive API scopes
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+# File fields requested when listing Drive files
+FILE_FIELDS = ('id', 'name', 'mimeType', 'size', 'modifiedTime', 'md5Checksum', 'parents',
+               'createdTime', 'fullFileExtension', 'originalFilename')
+
+# Optional sharing/link fields; larger responses, so only requested on demand
+LINK_FILE_FIELDS = ('owners', 'webContentLink', 'webViewLink', 'thumbnailLink')
+
+# Smallest useful field set for callers that only need identity and content info
+MINIMAL_FILE_FIELDS = ('id', 'name', 'mimeType', 'size', 'md5Checksum', 'parents')
+
+
+def _list_fields(fields: Iterable[str]) -> str:
+    """Build the files().list field mask for the given file fields."""
+    return f"nextPageToken, files({', '.join(fields)})"
+
+
+LIST_FIELDS = _list_fields(FILE_FIELDS)
+
+# Prefix shared by Google Workspace native MIME types (Docs, Sheets, folders, ...)
+WORKSPACE_MIME_PREFIX = 'application/vnd.google-apps.'
+
+# Listing queries: regular files only, or everything except folders
+FILES_QUERY = f"trashed = false and not mimeType contains '{WORKSPACE_MIME_PREFIX}'"
+FILES_AND_WORKSPACE_QUERY = f"trashed = false and mimeType != '{WORKSPACE_MIME_PREFIX}folder'"
+
+# Shared-drive flags passed with every files() call made by GoogleDriveSync
+ALL_DRIVES_ARGS = {'supportsAllDrives': True}
+LIST_ALL_DRIVES_ARGS = {'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+
+
+def _change_fields(fields: Iterable[str]) -> str:
+    """Build the changes().list field mask for the given file fields."""
+    return f"nextPageToken, newStartPageToken, changes(fileId, removed, file({', '.join(fields)}, trashed))"
+
+
+# Earliest modifiedTime boundary used when sharding parallel listings
+SHARD_START_YEAR = 2000
+
+# Marker placed on the shard queue when a shard finishes listing
+_SHARD_DONE = object()
+
+
+def _shard_boundaries(months_per_shard: int) -> List[str]:
+    """Build RFC 3339 modifiedTime boundaries from SHARD_START_YEAR until now.
+    
+    Args:
+        months_per_shard: Width of each time range in months
+        
+    Returns:
+        Ascending list of boundary timestamps
+    """
+    now = datetime.utcnow()
+    boundaries = []
+    year, month = SHARD_START_YEAR, 1
+    
+    while (year, month) <= (now.year, now.month):
+        boundaries.append(f"{year:04d}-{month:02d}-01T00:00:00")
+        month += months_per_shard
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    
+    return boundaries
+
+
+# Maximum number of calls the Drive batch endpoint accepts per request
+BATCH_SIZE = 100
+
+# Maximum folder depth traversed when building file paths
+MAX_PATH_DEPTH = 10
+
+# Size and lifetime (seconds) of the per-file metadata cache
+METADATA_CACHE_SIZE = 10000
+METADATA_CACHE_TTL = 300
+
+# Number of newly cached folders after which the folder cache is saved to disk
+FOLDER_CACHE_SAVE_INTERVAL = 100
+
+# Downloads and exports are buffered in memory up to this size, then spill to disk
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Chunk size and number of chunks read ahead when streaming a download
+STREAM_CHUNK_SIZE = 10 * 1024 * 1024
+STREAM_READ_AHEAD = 4
+
 
 class GoogleDriveSync:
     """Handles Google Drive synchronization."""
     
-    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token_drive.json'):
+    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token_drive.json',
+                 folder_cache_path: Optional[str] = None, scopes: Optional[List[str]] = None):
         """Initialize Google Drive sync.
         
         Args:
             credentials_path: Path to OAuth2 credentials file
             token_path: Path to store/load access token
+            folder_cache_path: Path to persist resolved folder metadata
+                (default: drive_folder_cache.json next to the token file)
+            scopes: OAuth2 scopes to request (default: SCOPES). Pass the union of
+                all services' scopes to share one authorization between clients.
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.scopes = scopes or SCOPES
+        self.folder_cache_path = folder_cache_path or os.path.join(
+            os.path.dirname(token_path), 'drive_folder_cache.json'
+        )
+        self.credentials = None
         self.service = None
+        self._files = None
+        self._thread_local = threading.local()
+        # Folder ID -> (name, parent ID) for resolved ancestors
+        self._folder_cache: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._unsaved_folders = 0
+        # Guards folder cache updates and saves; listings may run on another thread
+        self._folder_cache_lock = threading.RLock()
+        # Token for the next list_changes() call, set once a change listing completes
+        self.new_start_page_token: Optional[str] = None
+        
+        self._metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+        self._metadata_cache_lock = threading.Lock()
+        self._load_folder_cache()
         self._authenticate()
     
     def _authenticate(self):
         """Authenticate with Google Drive API."""
-        creds = None
-        
-        # Load existing token if available
-        if os.path.exists(self.token_path):
-            creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
-        
-        # If no valid credentials, authenticate
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                logger.info("Refreshing Google Drive credentials")
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(self.credentials_path):
-                    raise FileNotFoundError(
-                        f"Credentials file not found: {self.credentials_path}\n"
-                        "Please download OAuth2 credentials from Google Cloud Console"
-                    )
-                
-                logger.info("Starting OAuth2 flow for Google Drive")
-                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save credentials for future use
-            with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
-            logger.info(f"Saved credentials to {self.token_path}")
+        creds = GoogleAuth.get(self.credentials_path, self.token_path, self.scopes)
         
+        self.credentials = creds
         self.service = build('drive', 'v3', credentials=creds)
+        self._files = self.service.files()
         logger.info("Google Drive API authenticated successfully")
     
-    def list_all_files(self, page_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+    def _new_http(self) -> AuthorizedHttp:
+        """Create a dedicated authorized HTTP transport.
+        
+        httplib2 connections are not thread-safe, so any request executed off
+        the calling thread must use its own transport instead of the one bound
+        to ``self.service``.
+        
+        Returns:
+            Authorized httplib2 transport
+        """
+        return AuthorizedHttp(self.credentials, http=httplib2.Http())
+    
+    def _thread_http(self) -> AuthorizedHttp:
+        """Get the authorized HTTP transport owned by the current thread.
+        
+        Returns:
+            Authorized httplib2 transport, created on first use per thread
+        """
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = self._new_http()
+            self._thread_local.http = http
+        return http
+    
+    def workspace_exporter(self) -> 'GoogleWorkspaceExporter':
+        """Create a Workspace exporter that can be used from worker threads.
+        
+        Returns:
+            GoogleWorkspaceExporter exporting over the calling thread's transport
+        """
+        return GoogleWorkspaceExporter(self.service, http_factory=self._thread_http)
+    
+    def _load_folder_cache(self):
+        """Load persisted folder metadata from disk, if available."""
+        if not os.path.exists(self.folder_cache_path):
+            return
+        
+        try:
+            with open(self.folder_cache_path, 'r') as cache_file:
+                cached = json.load(cache_file)
+            self._folder_cache = {folder_id: (name, parent_id) for folder_id, (name, parent_id) in cached.items()}
+            logger.info(f"Loaded {len(self._folder_cache)} cached folders from {self.folder_cache_path}")
+        except (OSError, ValueError) as error:
+            logger.warning(f"Ignoring unreadable folder cache {self.folder_cache_path}: {error}")
+    
+    def save_folder_cache(self):
+        """Persist the folder cache to disk."""
+        temp_path = f"{self.folder_cache_path}.tmp"
+        try:
+            with self._folder_cache_lock:
+                with open(temp_path, 'w') as cache_file:
+                    json.dump(self._folder_cache, cache_file)
+                os.replace(temp_path, self.folder_cache_path)
+                self._unsaved_folders = 0
+            logger.debug(f"Saved {len(self._folder_cache)} folders to {self.folder_cache_path}")
+        except OSError as error:
+            logger.warning(f"Could not save folder cache: {error}")
+    
+    def clear_folder_cache(self):
+        """Discard cached folder metadata (e.g. after folders were renamed or moved)."""
+        with self._folder_cache_lock:
+            self._folder_cache.clear()
+            self.save_folder_cache()
+    
+    def _cache_folder(self, folder_id: str, name: str, parent_id: Optional[str]):
+        """Store folder metadata in the cache, saving periodically.
+        
+        Args:
+            folder_id: Folder ID
+            name: Folder name
+            parent_id: Parent folder ID, or None for a root
+        """
+        with self._folder_cache_lock:
+            self._folder_cache[folder_id] = (name, parent_id)
+            self._unsaved_folders += 1
+            if self._unsaved_folders >= FOLDER_CACHE_SAVE_INTERVAL:
+                self.save_folder_cache()
+    
+    def list_all_files(self, page_size: int = 100,
+                       fields: Tuple[str, ...] = FILE_FIELDS,
+                       extra_fields: Tuple[str, ...] = (),
+                       include_workspace_files: bool = False,
+                       resolve_parents: bool = True) -> Generator[Dict[str, Any], None, None]:
         """List all files from Google Drive with pagination.
         
+        Google Workspace files (Docs, Sheets, Slides, ...) cannot be downloaded
+        as-is and are filtered out server-side unless explicitly requested.
+        
         Args:
             page_size: Number of files per page
+            fields: File fields to request (e.g. MINIMAL_FILE_FIELDS)
+            extra_fields: Additional file fields to request (e.g. LINK_FILE_FIELDS)
+            include_workspace_files: Also list Google Workspace files (for export)
+            resolve_parents: Batch-fetch each page's unknown ancestor folders into
+                the folder cache before yielding it, so get_file_path() with the
+                listed parents needs no further API calls
             
         Yields:
             File metadata dictionaries
         """
-        page_token = None
+        if fields is FILE_FIELDS and not extra_fields:
+            list_fields = LIST_FIELDS
+        else:
+            list_fields = _list_fields(fields + tuple(extra_fields))
+        
         total_files = 0
+        query = FILES_AND_WORKSPACE_QUERY if include_workspace_files else FILES_QUERY
+        resolve_parents = resolve_parents and 'parents' in fields + tuple(extra_fields)
+        
+        def list_page(page_token: Optional[str], http: AuthorizedHttp) -> Dict[str, Any]:
+            return self._files.list(
+                pageSize=page_size,
+                pageToken=page_token,
+                fields=list_fields,
+                q=query,
+                **LIST_ALL_DRIVES_ARGS
+            ).execute(http=http)
         
         try:
-            while True:
-                # Query for all files, excluding folders and shortcuts
-                query = "trashed = false and mimeType != 'application/vnd.google-apps.folder'"
+            # Fetch the next page in the background while the current one is consumed
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='DriveListPrefetch') as executor:
+                http = self._new_http()
+                future = executor.submit(list_page, None, http)
                 
-                results = self.service.files().list(
-                    pageSize=page_size,
-                    pageToken=page_token,
-                    fields="nextPageToken, files(id, name, mimeType, size, modifiedTime, "
-                           "md5Checksum, parents, webContentLink, createdTime, owners, "
-                           "webViewLink, thumbnailLink, fullFileExtension, originalFilename)",
-                    q=query,
-                    supportsAllDrives=True,
-                    includeItemsFromAllDrives=True
-                ).execute()
-                
-                files = results.get('files', [])
-                total_files += len(files)
-                
-                logger.info(f"Retrieved {len(files)} files (total: {total_files})")
+                while future is not None:
+                    results = future.result()
+                    
+                    page_token = results.get('nextPageToken')
+                    future = executor.submit(list_page, page_token, http) if page_token else None
+                    
+                    files = results.get('files', [])
+                    total_files += len(files)
+                    
+                    logger.info(f"Retrieved {len(files)} files (total: {total_files})")
+                    
+                    if resolve_parents:
+                        self._prefetch_folders(file['parents'][0] for file in files if file.get('parents'))
+                    
+                    yield from files
+            
+            logger.info(f"Completed listing Google Drive files. Total: {total_files}")
+        
+        except HttpError as error:
+            logger.error(f"Error listing Google Drive files: {error}")
+            raise
+    
+    def list_all_files_parallel(self, num_shards: int = 8, page_size: int = 100,
+                                fields: Tuple[str, ...] = FILE_FIELDS,
+                                include_workspace_files: bool = False,
+                                months_per_shard: int = 3) -> Generator[Dict[str, Any], None, None]:
+        """List all files using several concurrent paginated scans.
+        
+        The listing is partitioned into modifiedTime ranges which are scanned
+        independently by ``num_shards`` workers. Files are yielded as pages
+        arrive, so ordering is not stable across shards.
+        
+        Args:
+            num_shards: Number of concurrent listing workers
+            page_size: Number of files per page
+            fields: File fields to request
+            include_workspace_files: Also list Google Workspace files (for export)
+            months_per_shard: Width of each modifiedTime range in months
+            
+        Yields:
+            File metadata dictionaries
+        """
+        list_fields = LIST_FIELDS if fields is FILE_FIELDS else _list_fields(fields)
+        query = FILES_AND_WORKSPACE_QUERY if include_workspace_files else FILES_QUERY
+        
+        boundaries = _shard_boundaries(months_per_shard)
+        shard_queries = [f"{query} and modifiedTime < '{boundaries[0]}'"]
+        shard_queries.extend(
+            f"{query} and modifiedTime >= '{start}' and modifiedTime < '{end}'"
+            for start, end in zip(boundaries, boundaries[1:])
+        )
+        shard_queries.append(f"{query} and modifiedTime >= '{boundaries[-1]}'")
+        
+        pages = queue.Queue(maxsize=num_shards * 2)
+        stop = threading.Event()
+        
+        def put(item):
+            # Give up once the consumer has stopped so workers never block forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        def scan(shard_query: str):
+            # Completion and errors are reported through the queue so the
+            # consumer learns about them in order with the pages
+            try:
+                http = self._thread_http()
+                page_token = None
                 
-                for file in files:
-                    # Skip Google Workspace native files that can't be downloaded as-is
-                    mime_type = file.get('mimeType', '')
-                    if mime_type.startswith('application/vnd.google-apps.'):
-                        # These are Google Docs, Sheets, Slides, etc.
-                        # We could export them, but skipping for now
-                        logger.debug(f"Skipping Google Workspace file: {file.get('name')} ({mime_type})")
-                        continue
+                while not stop.is_set():
+                    results = self._files.list(
+                        pageSize=page_size,
+                        pageToken=page_token,
+                        fields=list_fields,
+                        q=shard_query,
+                        **LIST_ALL_DRIVES_ARGS
+                    ).execute(http=http)
+                    
+                    put(results.get('files', []))
                     
-                    yield file
+                    page_token = results.get('nextPageToken')
+                    if not page_token:
+                        break
+            
+            except Exception as error:
+                put(error)
+                return
+            
+            put(_SHARD_DONE)
+        
+        total_files = 0
+        remaining = len(shard_queries)
+        executor = ThreadPoolExecutor(max_workers=num_shards, thread_name_prefix='DriveListShard')
+        
+        try:
+            for shard_query in shard_queries:
+                executor.submit(scan, shard_query)
+            
+            while remaining:
+                page = pages.get()
+                if page is _SHARD_DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(page, BaseException):
+                    raise page
                 
-                page_token = results.get('nextPageToken')
-                if not page_token:
-                    break
+                total_files += len(page)
+                logger.debug(f"Retrieved {len(page)} files (total: {total_files})")
+                
+                yield from page
             
-            logger.info(f"Completed listing Google Drive files. Total: {total_files}")
+            logger.info(f"Completed parallel listing of Google Drive files. Total: {total_files}")
         
         except HttpError as error:
             logger.error(f"Error listing Google Drive files: {error}")
             raise
+        
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def get_start_page_token(self) -> str:
+        """Get a changes token for the current state of the Drive.
+        
+        Returns:
+            Page token from which list_changes() reports later changes
+        """
+        response = self.service.changes().getStartPageToken(**ALL_DRIVES_ARGS).execute()
+        return response['startPageToken']
+    
+    def list_changes(self, start_token: str, page_size: int = 100,
+                     fields: Tuple[str, ...] = FILE_FIELDS,
+                     include_workspace_files: bool = False) -> Generator[Dict[str, Any], None, None]:
+        """List files added or modified since a changes token.
+        
+        Removed and trashed files, folders and (unless requested) Google
+        Workspace files are skipped, matching list_all_files(). Once the
+        generator is exhausted, new_start_page_token holds the token to pass
+        on the next run.
+        
+        Args:
+            start_token: Token from get_start_page_token() or a previous listing
+            page_size: Number of changes per page
+            fields: File fields to request
+            include_workspace_files: Also list Google Workspace files (for export)
+            
+        Yields:
+            File metadata dictionaries
+        """
+        self.new_start_page_token = None
+        change_fields = _change_fields(fields)
+        changes = self.service.changes()
+        total_files = 0
+        
+        def list_page(page_token: str, http: AuthorizedHttp) -> Dict[str, Any]:
+            return changes.list(
+                pageToken=page_token,
+                pageSize=page_size,
+                spaces='drive',
+                fields=change_fields,
+                **LIST_ALL_DRIVES_ARGS
+            ).execute(http=http)
+        
+        try:
+            # Fetch the next page in the background while the current one is consumed
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='DriveChangesPrefetch') as executor:
+                http = self._new_http()
+                future = executor.submit(list_page, start_token, http)
+                
+                while future is not None:
+                    results = future.result()
+                    
+                    page_token = results.get('nextPageToken')
+                    future = executor.submit(list_page, page_token, http) if page_token else None
+                    
+                    files = []
+                    for change in results.get('changes', []):
+                        file = change.get('file')
+                        if change.get('removed') or not file or file.pop('trashed', False):
+                            continue
+                        mime_type = file.get('mimeType', '')
+                        if mime_type.startswith(WORKSPACE_MIME_PREFIX) and (
+                                not include_workspace_files or mime_type == f'{WORKSPACE_MIME_PREFIX}folder'):
+                            continue
+                        files.append(file)
+                    
+                    total_files += len(files)
+                    logger.info(f"Retrieved {len(files)} changed files (total: {total_files})")
+                    
+                    if 'parents' in fields:
+                        self._prefetch_folders(file['parents'][0] for file in files if file.get('parents'))
+                    
+                    yield from files
+            
+            self.new_start_page_token = results.get('newStartPageToken')
+            logger.info(f"Completed listing Google Drive changes. Total: {total_files}")
+        
+        except HttpError as error:
+            logger.error(f"Error listing Google Drive changes: {error}")
+            raise
     
-    def get_file_path(self, file_id: str, file_name: str) -> str:
+    def get_file_path(self, file_id: str, file_name: str,
+                      parents: Optional[List[str]] = None) -> str:
         """Construct full path for a file by traversing parent folders.
         
         Args:
             file_id: Google Drive file ID
             file_name: File name
+            parents: The file's parent IDs if already known (e.g. from a listing);
+                saves a metadata request
             
         Returns:
             Full path string
         """
         try:
             path_parts = [file_name]
-            current_file = self.service.files().get(
-                fileId=file_id,
-                fields='parents',
-                supportsAllDrives=True
-            ).execute()
+            if parents is None:
+                current_file = self._files.get(
+                    fileId=file_id,
+                    fields='parents',
+                    **ALL_DRIVES_ARGS
+                ).execute(http=self._thread_http())
+                parents = current_file.get('parents')
             
-            # Traverse up to 10 levels to avoid infinite loops
-            max_depth = 10
+            parent_id = parents[0] if parents else None
+            
+            # Traverse a bounded number of levels to avoid infinite loops
             depth = 0
             
-            while 'parents' in current_file and depth < max_depth:
-                parent_id = current_file['parents'][0]
-                parent = self.service.files().get(
-                    fileId=parent_id,
-                    fields='name, parents',
-                    supportsAllDrives=True
-                ).execute()
+            while parent_id and depth < MAX_PATH_DEPTH:
+                if parent_id not in self._folder_cache:
+                    parent = self._files.get(
+                        fileId=parent_id,
+                        fields='name, parents',
+                        **ALL_DRIVES_ARGS
+                    ).execute(http=self._thread_http())
+                    grandparents = parent.get('parents')
+                    self._cache_folder(parent_id, parent.get('name', 'Unknown'),
+                                       grandparents[0] if grandparents else None)
                 
-                path_parts.insert(0, parent.get('name', 'Unknown'))
-                current_file = parent
+                name, parent_id = self._folder_cache[parent_id]
+                path_parts.insert(0, name)
                 depth += 1
             
             return '/'.join(path_parts)
@@ -163,19 +540,112 @@ class GoogleDriveSync:
             logger.warning(f"Could not construct path for {file_name}: {error}")
             return file_name
     
-    def download_file(self, file_id: str, file_name: str) -> io.BytesIO:
+    def _fetch_folders(self, folder_ids: List[str]) -> List[str]:
+        """Fetch folder metadata into the folder cache using batch requests.
+        
+        Args:
+            folder_ids: Folder IDs to fetch
+            
+        Returns:
+            IDs of folders that could not be fetched
+        """
+        failed = []
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                logger.warning(f"Could not fetch folder {request_id}: {exception}")
+                failed.append(request_id)
+                return
+            parents = response.get('parents')
+            self._cache_folder(request_id, response.get('name', 'Unknown'), parents[0] if parents else None)
+        
+        for start in range(0, len(folder_ids), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for folder_id in folder_ids[start:start + BATCH_SIZE]:
+                batch.add(
+                    self._files.get(fileId=folder_id, fields='id, name, parents', **ALL_DRIVES_ARGS),
+                    request_id=folder_id
+                )
+            batch.execute(http=self._thread_http())
+        
+        return failed
+    
+    def _prefetch_folders(self, folder_ids: Iterable[str]):
+        """Fetch uncached folders and all their ancestors into the folder cache.
+        
+        Ancestors are fetched level by level with batch requests, so the number
+        of round trips depends on tree depth rather than folder count.
+        
+        Args:
+            folder_ids: Folder IDs to resolve
+        """
+        unavailable = set()
+        missing = set(folder_ids)
+        
+        try:
+            for _ in range(MAX_PATH_DEPTH):
+                missing = [folder_id for folder_id in missing
+                           if folder_id not in self._folder_cache and folder_id not in unavailable]
+                if not missing:
+                    break
+                
+                unavailable.update(self._fetch_folders(missing))
+                missing = {self._folder_cache[folder_id][1] for folder_id in missing
+                           if folder_id in self._folder_cache and self._folder_cache[folder_id][1]}
+        
+        except HttpError as error:
+            logger.warning(f"Could not resolve folder paths: {error}")
+    
+    def resolve_paths(self, files: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Construct full paths for many files at once.
+        
+        Ancestor folders are fetched level by level with batch requests, so the
+        number of round trips depends on tree depth rather than file count.
+        
+        Args:
+            files: File metadata dictionaries (with 'id', 'name' and 'parents')
+            
+        Returns:
+            Mapping of file ID to full path string
+        """
+        self._prefetch_folders(file['parents'][0] for file in files if file.get('parents'))
+        
+        paths = {}
+        for file in files:
+            path_parts = [file.get('name', 'Unknown')]
+            parents = file.get('parents')
+            parent_id = parents[0] if parents else None
+            depth = 0
+            
+            while parent_id in self._folder_cache and depth < MAX_PATH_DEPTH:
+                name, parent_id = self._folder_cache[parent_id]
+                path_parts.insert(0, name)
+                depth += 1
+            
+            paths[file['id']] = '/'.join(path_parts)
+        
+        return paths
+    
+    def download_file(self, file_id: str, file_name: str,
+                      http: Optional[AuthorizedHttp] = None) -> BinaryIO:
         """Download a file from Google Drive.
         
+        Files up to SPOOL_MAX_SIZE are kept in memory; larger ones spill to a
+        temporary file on disk.
+        
         Args:
             file_id: Google Drive file ID
             file_name: File name (for logging)
+            http: Optional transport to download with (default: the calling
+                thread's own transport, so this is safe to call from any thread)
             
         Returns:
-            BytesIO buffer with file content
+            Seekable binary buffer with file content
         """
         try:
-            request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
-            file_buffer = io.BytesIO()
+            request = self._files.get_media(fileId=file_id, **ALL_DRIVES_ARGS)
+            request.http = http or self._thread_http()
+            file_buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
             downloader = MediaIoBaseDownload(file_buffer, request)
             
             done = False
@@ -185,30 +655,119 @@ class GoogleDriveSync:
                     progress = int(status.progress() * 100)
                     logger.debug(f"Downloading {file_name}: {progress}%")
             
+            logger.debug(f"Downloaded {file_name} ({file_buffer.tell()} bytes)")
             file_buffer.seek(0)
-            logger.info(f"Downloaded {file_name} ({file_buffer.getbuffer().nbytes} bytes)")
             return file_buffer
         
         except HttpError as error:
             logger.error(f"Error downloading file {file_name}: {error}")
             raise
     
+    def download_file_to_path(self, file_id: str, dest_path: str,
+                              chunk_size: int = 10 * 1024 * 1024,
+                              http: Optional[AuthorizedHttp] = None) -> int:
+        """Download a file from Google Drive straight to disk.
+        
+        Chunks are written directly to the destination file, so memory use is
+        bounded by chunk_size regardless of file size.
+        
+        Args:
+            file_id: Google Drive file ID
+            dest_path: Destination file path
+            chunk_size: Chunk size in bytes (default 10MB)
+            http: Optional transport to download with (default: the calling
+                thread's own transport, so this is safe to call from any thread)
+            
+        Returns:
+            Number of bytes written
+        """
+        try:
+            request = self._files.get_media(fileId=file_id, **ALL_DRIVES_ARGS)
+            request.http = http or self._thread_http()
+            
+            with open(dest_path, 'wb') as dest_file:
+                downloader = MediaIoBaseDownload(dest_file, request, chunksize=chunk_size)
+                
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+                    if status:
+                        progress = int(status.progress() * 100)
+                        logger.debug(f"Downloading {dest_path}: {progress}%")
+                
+                size = dest_file.tell()
+            
+            logger.debug(f"Downloaded {file_id} to {dest_path} ({size} bytes)")
+            return size
+        
+        except HttpError as error:
+            logger.error(f"Error downloading file {file_id} to {dest_path}: {error}")
+            raise
+    
+    def download_many(self, files: Iterable[Dict[str, Any]],
+                      max_workers: int = 16) -> Generator[Tuple[Dict[str, Any], BinaryIO], None, None]:
+        """Download several files concurrently.
+        
+        Each worker thread uses its own pooled transport. At most
+        ``2 * max_workers`` downloads are scheduled ahead of the consumer.
+        
+        Args:
+            files: File metadata dictionaries (must contain 'id' and 'name')
+            max_workers: Number of concurrent downloads
+            
+        Yields:
+            Tuples of (file metadata, content buffer) in input order
+        """
+        def download(file: Dict[str, Any]) -> BinaryIO:
+            return self.download_file(file['id'], file.get('name', file['id']), http=self._thread_http())
+        
+        files = iter(files)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='DriveDownload') as executor:
+            pending = deque(
+                (file, executor.submit(download, file))
+                for file in itertools.islice(files, max_workers * 2)
+            )
+            
+            while pending:
+                file, future = pending.popleft()
+                for next_file in itertools.islice(files, 1):
+                    pending.append((next_file, executor.submit(download, next_file)))
+                
+                yield file, future.result()
+    
     def download_file_chunked(self, file_id: str, file_name: str, 
-                             chunk_size: int = 10 * 1024 * 1024) -> Generator[bytes, None, None]:
+                             chunk_size: int = 10 * 1024 * 1024,
+                             expected_md5: Optional[str] = None,
+                             http: Optional[AuthorizedHttp] = None) -> Generator[bytes, None, str]:
         """Download a file in chunks for large files.
         
+        The MD5 digest is computed as chunks stream through, so verifying a
+        download needs no second pass over the data.
+        
         Args:
             file_id: Google Drive file ID
             file_name: File name (for logging)
             chunk_size: Chunk size in bytes (default 10MB)
+            expected_md5: Optional md5Checksum from the file metadata to verify against
+            http: Optional transport to download with (default: the calling
+                thread's own transport)
             
         Yields:
             Chunks of file data
+            
+        Returns:
+            Hex MD5 digest of the downloaded content (generator return value)
+            
+        Raises:
+            IOError: If expected_md5 is given and does not match the content
         """
         try:
-            request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+            request = self._files.get_media(fileId=file_id, **ALL_DRIVES_ARGS)
+            request.http = http or self._thread_http()
             file_buffer = io.BytesIO()
             downloader = MediaIoBaseDownload(file_buffer, request, chunksize=chunk_size)
+            md5 = hashlib.md5(usedforsecurity=False)
             
             done = False
             total_size = 0
@@ -219,44 +778,120 @@ class GoogleDriveSync:
                     progress = int(status.progress() * 100)
                     logger.debug(f"Downloading {file_name}: {progress}%")
                 
-                # Yield current buffer content
-                file_buffer.seek(0)
-                chunk = file_buffer.read()
-                if chunk:
+                # Yield only the bytes written by this chunk, then reset the
+                # buffer so memory stays bounded by chunk_size
+                if file_buffer.tell():
+                    chunk = file_buffer.getvalue()
+                    file_buffer.seek(0)
+                    file_buffer.truncate()
                     total_size += len(chunk)
+                    md5.update(chunk)
                     yield chunk
-                
-                # Reset buffer for next chunk
-                file_buffer.seek(0)
-                file_buffer.truncate()
             
-            logger.info(f"Downloaded {file_name} in chunks ({total_size} bytes total)")
+            checksum = md5.hexdigest()
+            if expected_md5 and checksum != expected_md5:
+                raise IOError(f"Checksum mismatch for {file_name}: expected {expected_md5}, got {checksum}")
+            
+            logger.debug(f"Downloaded {file_name} in chunks ({total_size} bytes total)")
+            return checksum
         
         except HttpError as error:
             logger.error(f"Error downloading file {file_name}: {error}")
             raise
     
+    def iter_download(self, file_id: str, file_name: str,
+                      chunk_size: int = STREAM_CHUNK_SIZE,
+                      expected_md5: Optional[str] = None,
+                      read_ahead: int = STREAM_READ_AHEAD) -> Iterator[bytes]:
+        """Stream a file's content, downloading ahead in a background thread.
+        
+        Up to ``read_ahead`` chunks are buffered, so downloading overlaps with
+        whatever consumes the chunks while memory stays bounded. Closing the
+        iterator early stops the download.
+        
+        Args:
+            file_id: Google Drive file ID
+            file_name: File name (for logging)
+            chunk_size: Chunk size in bytes
+            expected_md5: Optional md5Checksum to verify; a mismatch raises IOError
+                after the last chunk
+            read_ahead: Maximum number of chunks buffered ahead of the consumer
+            
+        Yields:
+            Chunks of file data
+        """
+        chunks = queue.Queue(maxsize=read_ahead)
+        stop = threading.Event()
+        
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        def produce():
+            try:
+                for chunk in self.download_file_chunked(file_id, file_name, chunk_size, expected_md5):
+                    if stop.is_set():
+                        return
+                    put(chunk)
+            except Exception as error:
+                put(error)
+                return
+            put(None)
+        
+        producer = threading.Thread(target=produce, name=f"DriveStream-{file_id}", daemon=True)
+        producer.start()
+        
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        finally:
+            stop.set()
+    
     def get_file_metadata(self, file_id: str) -> Dict[str, Any]:
         """Get detailed metadata for a specific file.
         
+        Results are cached for METADATA_CACHE_TTL seconds.
+        
         Args:
             file_id: Google Drive file ID
             
         Returns:
             File metadata dictionary
         """
+        with self._metadata_cache_lock:
+            file = self._metadata_cache.get(file_id)
+        if file is not None:
+            return file
+        
         try:
-            file = self.service.files().get(
+            file = self._files.get(
                 fileId=file_id,
                 fields="id, name, mimeType, size, modifiedTime, md5Checksum, "
                        "parents, webContentLink, createdTime, owners, description, "
                        "properties, appProperties, capabilities",
-                supportsAllDrives=True
+                **ALL_DRIVES_ARGS
             ).execute()
-            return file
         except HttpError as error:
             logger.error(f"Error getting file metadata: {error}")
             raise
+        
+        with self._metadata_cache_lock:
+            self._metadata_cache[file_id] = file
+        return file
+    
+    def clear_metadata_cache(self):
+        """Discard cached file metadata."""
+        with self._metadata_cache_lock:
+            self._metadata_cache.clear()
 
 
 class GoogleWorkspaceExporter:
@@ -281,14 +916,18 @@ class GoogleWorkspaceExporter:
             'extension': '.pdf'
         },
     }
+    EXPORTABLE_MIMES = frozenset(EXPORT_FORMATS)
     
-    def __init__(self, service):
+    def __init__(self, service, http_factory: Optional[Callable[[], AuthorizedHttp]] = None):
         """Initialize exporter with Google Drive service.
         
         Args:
             service: Authenticated Google Drive service
+            http_factory: Optional callable returning the transport to export
+                with; required when exporting from several threads
         """
         self.service = service
+        self._http_factory = http_factory
     
     def can_export(self, mime_type: str) -> bool:
         """Check if a Google Workspace file can be exported.
@@ -299,9 +938,9 @@ class GoogleWorkspaceExporter:
         Returns:
             True if exportable, False otherwise
         """
-        return mime_type in self.EXPORT_FORMATS
+        return mime_type in self.EXPORTABLE_MIMES
     
-    def export_file(self, file_id: str, mime_type: str, file_name: str) -> io.BytesIO:
+    def export_file(self, file_id: str, mime_type: str, file_name: str) -> BinaryIO:
         """Export a Google Workspace file to a downloadable format.
         
         Args:
@@ -310,7 +949,7 @@ class GoogleWorkspaceExporter:
             file_name: File name (for logging)
             
         Returns:
-            BytesIO buffer with exported content
+            Seekable binary buffer with exported content (spills to disk above SPOOL_MAX_SIZE)
         """
         if not self.can_export(mime_type):
             raise ValueError(f"Cannot export MIME type: {mime_type}")
@@ -319,7 +958,9 @@ class GoogleWorkspaceExporter:
         
         try:
             request = self.service.files().export_media(fileId=file_id, mimeType=export_format)
-            file_buffer = io.BytesIO()
+            if self._http_factory is not None:
+                request.http = self._http_factory()
+            file_buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
             downloader = MediaIoBaseDownload(file_buffer, request)
             
             done = False
@@ -330,7 +971,7 @@ class GoogleWorkspaceExporter:
                     logger.debug(f"Exporting {file_name}: {progress}%")
             
             file_buffer.seek(0)
-            logger.info(f"Exported {file_name} to {export_format}")
+            logger.debug(f"Exported {file_name} to {export_format}")
             return file_buffer
         
         except HttpError as error:
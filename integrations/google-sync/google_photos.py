@@ -5,14 +5,21 @@ Handles authentication, media listing, and downloading from Google Photos.
 
 import io
 import logging
-import os
+import re
+import itertools
+import orjson
+import queue
 import requests
-from typing import Optional, List, Dict, Any, Generator
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, BinaryIO, Generator, Callable, Iterable, Tuple
 from datetime import datetime
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
+from google_auth import GoogleAuth
 
 logger = logging.getLogger(__name__)
 
@@ -22,54 +29,191 @@ SCOPES = ['https://www.googleapis.com/auth/photoslibrary.readonly']
 # Google Photos API base URL
 PHOTOS_API_BASE = 'https://photoslibrary.googleapis.com/v1'
 
+# Connection pool size for media downloads
+DOWNLOAD_POOL_SIZE = 32
+
+# Retry policy for rate limits and transient server errors. mediaItems:search
+# is a read-only POST, so POST is safe to retry as well.
+MAX_RETRIES = 5
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Size and lifetime (seconds) of the per-item metadata cache
+METADATA_CACHE_SIZE = 10000
+METADATA_CACHE_TTL = 300
+
+# Leading YYYY-MM-DDT of an ISO-8601 creationTime
+ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}T')
+
+# Read size used when buffering a whole media item in memory
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Reusable download buffers: size of each buffer and how many are kept idle
+POOL_BUFFER_SIZE = 8 * 1024 * 1024
+POOL_MAX_BUFFERS = 16
+
+# Items known to be smaller than this get an exactly sized buffer instead of a
+# pooled one, so small photos do not each hold a whole pool buffer
+POOL_MIN_SIZE = 2 * 1024 * 1024
+
+
+class BufferPool:
+    """Thread-safe free list of reusable bytearray download buffers."""
+    
+    def __init__(self, buffer_size: int = POOL_BUFFER_SIZE, max_buffers: int = POOL_MAX_BUFFERS,
+                 min_pooled_size: int = POOL_MIN_SIZE):
+        """Initialize the pool.
+        
+        Args:
+            buffer_size: Size of each pooled buffer
+            max_buffers: Maximum number of idle buffers kept for reuse
+            min_pooled_size: Smallest known size served from the pool
+        """
+        self.buffer_size = buffer_size
+        self.min_pooled_size = min_pooled_size
+        self._free = queue.LifoQueue(maxsize=max_buffers)
+    
+    def acquire(self, min_size: int = 0) -> bytearray:
+        """Get a buffer of at least min_size bytes.
+        
+        Requests larger than buffer_size, or known to be smaller than
+        min_pooled_size, get a one-off buffer of exactly min_size bytes that
+        is not pooled.
+        
+        Args:
+            min_size: Minimum buffer size needed, or 0 if unknown
+            
+        Returns:
+            Buffer to write into
+        """
+        if min_size > self.buffer_size or 0 < min_size < self.min_pooled_size:
+            return bytearray(min_size)
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return bytearray(self.buffer_size)
+    
+    def release(self, buffer: bytearray):
+        """Return a buffer to the pool.
+        
+        Buffers that are not pool-sized (one-off or grown) are dropped.
+        
+        Args:
+            buffer: Buffer obtained from acquire()
+        """
+        if len(buffer) != self.buffer_size:
+            return
+        try:
+            self._free.put_nowait(buffer)
+        except queue.Full:
+            pass
+
+
+class PooledBuffer(io.RawIOBase):
+    """Seekable read-only stream over the filled part of a pooled buffer.
+    
+    The buffer goes back to its pool when the stream is closed.
+    """
+    
+    def __init__(self, buffer: bytearray, size: int, pool: BufferPool):
+        """Wrap a filled buffer.
+        
+        Args:
+            buffer: Buffer holding the content
+            size: Number of valid bytes at the start of buffer
+            pool: Pool to return the buffer to on close
+        """
+        super().__init__()
+        self._buffer = buffer
+        self._view = memoryview(buffer)[:size]
+        self._pool = pool
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, target) -> int:
+        data = self._view[self._position:self._position + len(target)]
+        target[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+    
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._position + size
+        data = self._view[self._position:end].tobytes()
+        self._position += len(data)
+        return data
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._pool.release(self._buffer)
+            self._buffer = None
+        super().close()
+
 
 class GooglePhotosSync:
     """Handles Google Photos synchronization."""
     
-    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token_photos.json'):
+    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token_photos.json',
+                 scopes: Optional[List[str]] = None):
         """Initialize Google Photos sync.
         
         Args:
             credentials_path: Path to OAuth2 credentials file
             token_path: Path to store/load access token
+            scopes: OAuth2 scopes to request (default: SCOPES). Pass the union of
+                all services' scopes to share one authorization between clients.
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.scopes = scopes or SCOPES
         self.credentials = None
+        
+        # Shared session so API calls and concurrent downloads reuse pooled
+        # connections and back off automatically on 429/5xx
+        self._session = requests.Session()
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=DOWNLOAD_POOL_SIZE,
+                              pool_maxsize=DOWNLOAD_POOL_SIZE)
+        self._session.mount('https://', adapter)
+        
+        self._metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+        self._metadata_cache_lock = threading.Lock()
+        
+        self.buffer_pool = BufferPool()
+        
         self._authenticate()
     
     def _authenticate(self):
         """Authenticate with Google Photos API."""
-        creds = None
-        
-        # Load existing token if available
-        if os.path.exists(self.token_path):
-            creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
-        
-        # If no valid credentials, authenticate
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                logger.info("Refreshing Google Photos credentials")
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(self.credentials_path):
-                    raise FileNotFoundError(
-                        f"Credentials file not found: {self.credentials_path}\n"
-                        "Please download OAuth2 credentials from Google Cloud Console"
-                    )
-                
-                logger.info("Starting OAuth2 flow for Google Photos")
-                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save credentials for future use
-            with open(self.token_path, 'w') as token:
-                token.write(creds.to_json())
-            logger.info(f"Saved credentials to {self.token_path}")
-        
-        self.credentials = creds
+        self.credentials = GoogleAuth.get(self.credentials_path, self.token_path, self.scopes)
         logger.info("Google Photos API authenticated successfully")
     
+    def close(self):
+        """Release pooled HTTP connections."""
+        self._session.close()
+    
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """Make an authenticated request to Google Photos API.
         
@@ -85,9 +229,30 @@ class GooglePhotosSync:
         headers = kwargs.pop('headers', {})
         headers['Authorization'] = f'Bearer {self.credentials.token}'
         
-        response = requests.request(method, url, headers=headers, **kwargs)
+        response = self._session.request(method, url, headers=headers, **kwargs)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
+    
+    def _iter_pages(self, fetch_page: Callable[[Optional[str]], Dict[str, Any]]) -> Generator[Dict[str, Any], None, None]:
+        """Iterate over API response pages, prefetching the next page in the background.
+        
+        Args:
+            fetch_page: Callable taking a page token (None for the first page) and
+                returning the response JSON for that page
+            
+        Yields:
+            Response JSON for each page
+        """
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='PhotosListPrefetch') as executor:
+            future = executor.submit(fetch_page, None)
+            
+            while future is not None:
+                response = future.result()
+                
+                page_token = response.get('nextPageToken')
+                future = executor.submit(fetch_page, page_token) if page_token else None
+                
+                yield response
     
     def list_all_media_items(self, page_size: int = 100) -> Generator[Dict[str, Any], None, None]:
         """List all media items from Google Photos with pagination.
@@ -98,17 +263,16 @@ class GooglePhotosSync:
         Yields:
             Media item dictionaries
         """
-        page_token = None
         total_items = 0
         
+        def fetch_page(page_token: Optional[str]) -> Dict[str, Any]:
+            params = {'pageSize': min(page_size, 100)}
+            if page_token:
+                params['pageToken'] = page_token
+            return self._make_request('GET', 'mediaItems', params=params)
+        
         try:
-            while True:
-                params = {'pageSize': min(page_size, 100)}
-                if page_token:
-                    params['pageToken'] = page_token
-                
-                response = self._make_request('GET', 'mediaItems', params=params)
-                
+            for response in self._iter_pages(fetch_page):
                 media_items = response.get('mediaItems', [])
                 total_items += len(media_items)
                 
@@ -116,10 +280,6 @@ class GooglePhotosSync:
                 
                 for item in media_items:
                     yield item
-                
-                page_token = response.get('nextPageToken')
-                if not page_token:
-                    break
             
             logger.info(f"Completed listing Google Photos. Total: {total_items}")
         
@@ -134,22 +294,16 @@ class GooglePhotosSync:
             List of album dictionaries
         """
         albums = []
-        page_token = None
+        
+        def fetch_page(page_token: Optional[str]) -> Dict[str, Any]:
+            params = {'pageSize': 50}
+            if page_token:
+                params['pageToken'] = page_token
+            return self._make_request('GET', 'albums', params=params)
         
         try:
-            while True:
-                params = {'pageSize': 50}
-                if page_token:
-                    params['pageToken'] = page_token
-                
-                response = self._make_request('GET', 'albums', params=params)
-                
-                page_albums = response.get('albums', [])
-                albums.extend(page_albums)
-                
-                page_token = response.get('nextPageToken')
-                if not page_token:
-                    break
+            for response in self._iter_pages(fetch_page):
+                albums.extend(response.get('albums', []))
             
             logger.info(f"Retrieved {len(albums)} albums")
             return albums
@@ -168,20 +322,19 @@ class GooglePhotosSync:
         Yields:
             Media item dictionaries
         """
-        page_token = None
         total_items = 0
         
+        def fetch_page(page_token: Optional[str]) -> Dict[str, Any]:
+            body = {
+                'albumId': album_id,
+                'pageSize': min(page_size, 100)
+            }
+            if page_token:
+                body['pageToken'] = page_token
+            return self._make_request('POST', 'mediaItems:search', json=body)
+        
         try:
-            while True:
-                body = {
-                    'albumId': album_id,
-                    'pageSize': min(page_size, 100)
-                }
-                if page_token:
-                    body['pageToken'] = page_token
-                
-                response = self._make_request('POST', 'mediaItems:search', json=body)
-                
+            for response in self._iter_pages(fetch_page):
                 media_items = response.get('mediaItems', [])
                 total_items += len(media_items)
                 
@@ -189,10 +342,6 @@ class GooglePhotosSync:
                 
                 for item in media_items:
                     yield item
-                
-                page_token = response.get('nextPageToken')
-                if not page_token:
-                    break
             
             logger.info(f"Completed listing album media. Total: {total_items}")
         
@@ -200,14 +349,15 @@ class GooglePhotosSync:
             logger.error(f"Error listing album media items: {error}")
             raise
     
-    def download_media_item(self, item: Dict[str, Any]) -> io.BytesIO:
+    def download_media_item(self, item: Dict[str, Any]) -> BinaryIO:
         """Download a media item from Google Photos.
         
         Args:
             item: Media item dictionary
             
         Returns:
-            BytesIO buffer with media content
+            Seekable stream with media content. Close it once done so its
+            buffer can be reused by later downloads.
         """
         base_url = item.get('baseUrl')
         if not base_url:
@@ -222,25 +372,60 @@ class GooglePhotosSync:
             download_url = f"{base_url}=d"
         
         try:
-            response = requests.get(download_url, stream=True)
+            response = self._session.get(download_url, stream=True)
             response.raise_for_status()
             
-            file_buffer = io.BytesIO()
-            total_size = 0
-            
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file_buffer.write(chunk)
-                    total_size += len(chunk)
+            # Fill a buffer in place, growing it only for oversized items; the
+            # buffer is pooled unless Content-Length shows the item is small
+            content = self.buffer_pool.acquire(int(response.headers.get('Content-Length') or 0))
+            size = 0
+            try:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    end = size + len(chunk)
+                    if end > len(content):
+                        content.extend(bytes(max(end - len(content), len(content))))
+                    content[size:end] = chunk
+                    size = end
+            except Exception:
+                self.buffer_pool.release(content)
+                raise
             
-            file_buffer.seek(0)
-            logger.info(f"Downloaded {item.get('filename')} ({total_size} bytes)")
-            return file_buffer
+            logger.debug(f"Downloaded {item.get('filename')} ({size} bytes)")
+            return PooledBuffer(content, size, self.buffer_pool)
         
         except requests.RequestException as error:
             logger.error(f"Error downloading media item {item.get('filename')}: {error}")
             raise
     
+    def download_many(self, items: Iterable[Dict[str, Any]],
+                      max_workers: int = 16) -> Generator[Tuple[Dict[str, Any], BinaryIO], None, None]:
+        """Download several media items concurrently.
+        
+        At most ``2 * max_workers`` downloads are scheduled ahead of the consumer,
+        so memory stays bounded for large libraries.
+        
+        Args:
+            items: Media item dictionaries
+            max_workers: Number of concurrent downloads
+            
+        Yields:
+            Tuples of (media item, content stream) in input order
+        """
+        items = iter(items)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='PhotosDownload') as executor:
+            pending = deque(
+                (item, executor.submit(self.download_media_item, item))
+                for item in itertools.islice(items, max_workers * 2)
+            )
+            
+            while pending:
+                item, future = pending.popleft()
+                for next_item in itertools.islice(items, 1):
+                    pending.append((next_item, executor.submit(self.download_media_item, next_item)))
+                
+                yield item, future.result()
+    
     def download_media_item_chunked(self, item: Dict[str, Any], 
                                    chunk_size: int = 10 * 1024 * 1024) -> Generator[bytes, None, None]:
         """Download a media item in chunks for large files.
@@ -263,7 +448,7 @@ class GooglePhotosSync:
             download_url = f"{base_url}=d"
         
         try:
-            response = requests.get(download_url, stream=True)
+            response = self._session.get(download_url, stream=True)
             response.raise_for_status()
             
             total_size = 0
@@ -272,7 +457,7 @@ class GooglePhotosSync:
                     total_size += len(chunk)
                     yield chunk
             
-            logger.info(f"Downloaded {item.get('filename')} in chunks ({total_size} bytes total)")
+            logger.debug(f"Downloaded {item.get('filename')} in chunks ({total_size} bytes total)")
         
         except requests.RequestException as error:
             logger.error(f"Error downloading media item {item.get('filename')}: {error}")
@@ -281,18 +466,34 @@ class GooglePhotosSync:
     def get_media_item_metadata(self, item_id: str) -> Dict[str, Any]:
         """Get detailed metadata for a specific media item.
         
+        Results are cached for METADATA_CACHE_TTL seconds, well within the
+        lifetime of the returned baseUrl.
+        
         Args:
             item_id: Media item ID
             
         Returns:
             Media item dictionary with full metadata
         """
+        with self._metadata_cache_lock:
+            response = self._metadata_cache.get(item_id)
+        if response is not None:
+            return response
+        
         try:
             response = self._make_request('GET', f'mediaItems/{item_id}')
-            return response
         except requests.RequestException as error:
             logger.error(f"Error getting media item metadata: {error}")
             raise
+        
+        with self._metadata_cache_lock:
+            self._metadata_cache[item_id] = response
+        return response
+    
+    def clear_metadata_cache(self):
+        """Discard cached media item metadata."""
+        with self._metadata_cache_lock:
+            self._metadata_cache.clear()
     
     def normalize_media_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize a media item to a standard format compatible with state manager.
@@ -304,20 +505,27 @@ class GooglePhotosSync:
             Normalized dictionary
         """
         media_metadata = item.get('mediaMetadata', {})
+        filename = item.get('filename', 'unknown')
         
         # Extract creation time
-        creation_time = media_metadata.get('creationTime', datetime.utcnow().isoformat())
+        creation_time = media_metadata.get('creationTime')
+        if creation_time is None:
+            creation_time = datetime.utcnow().isoformat()
         
-        # Build path based on date
-        try:
-            dt = datetime.fromisoformat(creation_time.replace('Z', '+00:00'))
-            path = f"GooglePhotos/{dt.year}/{dt.month:02d}/{item.get('filename', 'unknown')}"
-        except:
-            path = f"GooglePhotos/{item.get('filename', 'unknown')}"
+        # Build path based on date. creationTime is ISO-8601 (YYYY-MM-DDTHH:MM:SSZ),
+        # so year and month can be sliced directly without parsing.
+        if ISO_DATE_RE.match(creation_time):
+            path = f"GooglePhotos/{creation_time[0:4]}/{creation_time[5:7]}/{filename}"
+        else:
+            try:
+                dt = datetime.fromisoformat(creation_time.replace('Z', '+00:00'))
+                path = f"GooglePhotos/{dt.year}/{dt.month:02d}/{filename}"
+            except (ValueError, AttributeError):
+                path = f"GooglePhotos/{filename}"
         
         return {
             'id': item.get('id'),
-            'name': item.get('filename', 'unknown'),
+            'name': filename,
             'path': path,
             'mimeType': item.get('mimeType', 'application/octet-stream'),
             'size': None,  # Google Photos API doesn't provide size directly
@@ -4,32 +4,189 @@ Orchestrates synchronization from Google services to Silo storage.
 """
 
 import argparse
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Dict, Any, BinaryIO, Callable, Iterable, Iterator, Set, TypeVar
 import time
+from datetime import datetime
 
 from state_manager import StateManager
+import google_drive
+import google_photos
 from google_drive import GoogleDriveSync, GoogleWorkspaceExporter
 from google_photos import GooglePhotosSync
-from silo_client import SiloUploadClient, UploadQueue
+from silo_client import SiloUploadClient, UploadQueue, UploadResult
+from download_cache import DownloadCache
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('google_sync.log')
-    ]
-)
+# OAuth2 scopes required by each service
+SERVICE_SCOPES = {
+    'drive': google_drive.SCOPES,
+    'photos': google_photos.SCOPES,
+}
+
+
+# Default upper bound on upload workers; more mostly adds contention on the
+# Silo server, but can pay off on high-latency links
+MAX_UPLOAD_WORKERS = 16
+
+# Memory budget for downloaded files waiting to be uploaded
+DOWNLOAD_BUDGET_BASE = 2 * 1024 * 1024 * 1024
+DOWNLOAD_BUDGET_PER_WORKER = 512 * 1024 * 1024
+
+# Assumed size of a Google Photos item, whose metadata carries no byte size
+PHOTOS_SIZE_ESTIMATE = 8 * 1024 * 1024
+
+# Assumed size of an exported Google Workspace file, which has no byte size
+EXPORT_SIZE_ESTIMATE = 8 * 1024 * 1024
+
+# Google Photos baseUrls expire after 60 minutes; queued ones younger than
+# this are downloaded without fetching the media item again
+PHOTOS_BASE_URL_MAX_AGE = 50 * 60
+
+# Maximum number of queued uploads retried per --process-queue run
+QUEUE_BATCH_SIZE = 100
+
+# Number of listed files buffered ahead of the sync loop
+LISTING_PREFETCH = 1000
+
+# Drive files larger than this are streamed to Silo instead of being buffered
+STREAM_THRESHOLD = google_drive.SPOOL_MAX_SIZE
+
+# Memory held by one streaming transfer (read-ahead chunks plus the one in flight)
+STREAM_MEMORY = google_drive.STREAM_CHUNK_SIZE * (google_drive.STREAM_READ_AHEAD + 1)
+
+
+# Configure logging; records are written to the console and log file by a
+# background listener so transfer threads never wait on log I/O
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('google_sync.log')
+]
+for _log_handler in _log_handlers:
+    _log_handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue()
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
 logger = logging.getLogger(__name__)
 
 
+T = TypeVar('T')
+
+
+def prefetch(items: Iterable[T], buffer_size: int = LISTING_PREFETCH) -> Iterator[T]:
+    """Iterate over items produced ahead of time by a background thread.
+    
+    Listing work (page requests, folder lookups) then overlaps with the
+    consumer instead of stalling it. Closing the iterator early stops the
+    producer. Items must not be None or exceptions.
+    
+    Args:
+        items: Iterable to consume in the background
+        buffer_size: Maximum number of items buffered ahead of the consumer
+        
+    Yields:
+        Items of the iterable, in order
+    """
+    buffer = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    return
+                put(item)
+        except Exception as error:
+            put(error)
+            return
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+        put(None)
+    
+    producer = threading.Thread(target=produce, name="ListingPrefetch", daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            item = buffer.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class ByteBudget:
+    """Counting semaphore measured in bytes.
+    
+    Requests larger than the whole budget are clamped to it, so a single huge
+    file waits for everything else to finish instead of blocking forever.
+    """
+    
+    def __init__(self, capacity: int):
+        """Initialize the budget.
+        
+        Args:
+            capacity: Total number of bytes that may be held at once
+        """
+        self.capacity = capacity
+        self._available = capacity
+        self._condition = threading.Condition()
+    
+    def acquire(self, size: int) -> int:
+        """Block until size bytes are available and take them.
+        
+        Args:
+            size: Number of bytes to reserve
+            
+        Returns:
+            Number of bytes actually reserved; pass this to release()
+        """
+        size = max(0, min(size, self.capacity))
+        with self._condition:
+            self._condition.wait_for(lambda: self._available >= size)
+            self._available -= size
+        return size
+    
+    def release(self, size: int):
+        """Return previously reserved bytes to the budget.
+        
+        Args:
+            size: Value returned by acquire()
+        """
+        with self._condition:
+            self._available += size
+            self._condition.notify_all()
+
+
 class GoogleSiloSync:
     """Main sync orchestrator."""
     
@@ -39,8 +196,11 @@ class GoogleSiloSync:
                  services: list,
                  credentials_path: str = 'credentials.json',
                  state_db: str = 'google_sync_state.db',
-                 num_workers: int = 3,
-                 max_retries: int = 5):
+                 num_workers: Optional[int] = None,
+                 max_retries: int = 5,
+                 cache_dir: str = 'download_cache',
+                 cache_size_gb: float = 10.0,
+                 max_upload_workers: int = MAX_UPLOAD_WORKERS):
         """Initialize the sync orchestrator.
         
         Args:
@@ -49,26 +209,63 @@ class GoogleSiloSync:
             services: List of services to sync ('drive', 'photos')
             credentials_path: Path to Google OAuth credentials
             state_db: Path to state database
-            num_workers: Number of upload worker threads
+            num_workers: Number of download and upload worker threads. When None,
+                starts at twice the CPU count (capped) and the upload workers
+                are tuned at runtime
             max_retries: Maximum upload retry attempts
+            cache_dir: Directory for files downloaded while retrying queued uploads
+            cache_size_gb: Maximum size of the download cache in GB
+            max_upload_workers: Upper bound on worker threads, and on upload
+                workers when tuning at runtime
         """
         self.silo_url = silo_url
         self.bucket = bucket
         self.services = services
         self.credentials_path = credentials_path
         
-        # Initialize components
+        # Request every selected service's scopes up front so all clients share
+        # a single OAuth authorization
+        self.scopes = sorted({scope for service in services for scope in SERVICE_SCOPES.get(service, [])})
+        
+        autotune = num_workers is None
+        if autotune:
+            num_workers = min(max_upload_workers, (os.cpu_count() or 4) * 2)
+        elif num_workers > max_upload_workers:
+            logger.warning(f"Limiting upload workers to {max_upload_workers}")
+            num_workers = max_upload_workers
+        
+        # Initialize components; uploads run on the upload workers and, for
+        # streamed files, on the download workers
         self.state_manager = StateManager(state_db)
         self.silo_client = SiloUploadClient(
             server_url=silo_url,
             bucket=bucket,
-            max_retries=max_retries
+            max_retries=max_retries,
+            pool_size=max_upload_workers * 2
         )
+        
+        # Keep the queue short: each entry holds a downloaded file
         self.upload_queue = UploadQueue(
             client=self.silo_client,
-            num_workers=num_workers
+            num_workers=num_workers,
+            queue_size=num_workers * 2,
+            autotune=autotune,
+            max_workers=max_upload_workers
         )
         
+        # Concurrent downloads, limited by count and by bytes held in memory
+        self.download_executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='Download')
+        self.download_budget = ByteBudget(DOWNLOAD_BUDGET_BASE + DOWNLOAD_BUDGET_PER_WORKER * num_workers)
+        self._download_slots = threading.BoundedSemaphore(num_workers * 2)
+        self._pending_downloads: Set[Future] = set()
+        self._pending_lock = threading.Lock()
+        
+        # Downloads of queued uploads, kept until the upload succeeds
+        self.download_cache = DownloadCache(cache_dir, max_bytes=int(cache_size_gb * 1024 ** 3))
+        
+        # MD5 checksum -> Silo file ID of content already uploaded
+        self._synced_checksums: Dict[str, str] = {}
+        
         # Service clients (initialized on demand)
         self.drive_client: Optional[GoogleDriveSync] = None
         self.photos_client: Optional[GooglePhotosSync] = None
@@ -80,11 +277,205 @@ class GoogleSiloSync:
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
     
+    def _scopes_for(self, service: str) -> list:
+        """Get the OAuth2 scopes to request when creating a service client.
+        
+        Args:
+            service: Service name ('drive', 'photos')
+            
+        Returns:
+            Scopes of all selected services plus those of the given service
+        """
+        return sorted(set(self.scopes) | set(SERVICE_SCOPES[service]))
+    
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals."""
         logger.info(f"Received signal {signum}. Shutting down gracefully...")
         self.running = False
     
+    def _submit_upload(self, service: str, google_id: str, file_buffer: BinaryIO,
+                       file_name: str, mime_type: str, metadata: Dict[str, Any],
+                       file_record: Dict[str, Any], stats: Dict[str, int], stats_lock: threading.Lock,
+                       on_complete: Optional[Callable[[], None]] = None):
+        """Upload a downloaded file in the background and record the outcome.
+        
+        The next file can be downloaded while upload workers send this one.
+        Successful uploads are marked synced; failures go to the retry queue.
+        
+        Args:
+            service: Service name ('drive', 'photos')
+            google_id: Google file or media item ID
+            file_buffer: Downloaded file content
+            file_name: File name
+            mime_type: MIME type
+            metadata: Upload metadata
+            file_record: File metadata stored in the state DB
+            stats: Sync statistics to update
+            stats_lock: Lock guarding stats
+            on_complete: Optional callable run once the outcome is recorded
+        """
+        def on_done(future):
+            try:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = UploadResult(success=False, file_name=file_name, error_message=str(e))
+                self._record_upload(result, service, google_id, file_name, file_record, stats, stats_lock)
+            finally:
+                if on_complete:
+                    on_complete()
+        
+        self.upload_queue.add_upload(file_buffer, file_name, mime_type, metadata, callback=on_done)
+    
+    def _record_upload(self, result: UploadResult, service: str, google_id: str, file_name: str,
+                       file_record: Dict[str, Any], stats: Dict[str, int], stats_lock: threading.Lock):
+        """Record the outcome of a background upload in the stats and state DB.
+        
+        The byte count comes from the upload result, so buffers are never probed
+        for their size and streamed uploads are counted the same way.
+        """
+        if result.success:
+            with stats_lock:
+                stats['uploaded'] += 1
+                stats['bytes_uploaded'] += result.bytes_uploaded
+            self._mark_synced(google_id, service, file_record, result.file_id)
+            if file_record.get('md5Checksum') and result.file_id:
+                self._synced_checksums[file_record['md5Checksum']] = result.file_id
+            logger.debug(f"Successfully synced: {file_name}")
+        else:
+            with stats_lock:
+                stats['failed'] += 1
+            logger.error(f"Failed to upload {file_name}: {result.error_message}")
+            
+            # Add to upload queue for retry
+            self._queue_retry(google_id, service, file_record)
+    
+    def _submit_download(self, download: Callable[[], BinaryIO], memory_size: int,
+                         service: str, google_id: str, file_name: str, mime_type: str,
+                         metadata: Dict[str, Any], file_record: Dict[str, Any],
+                         stats: Dict[str, int], stats_lock: threading.Lock):
+        """Download a file in the background, then queue it for upload.
+        
+        Blocks while too many downloads are in flight or while the download
+        budget cannot cover memory_size. The reservation is held until the
+        upload has finished.
+        
+        Args:
+            download: Callable returning the downloaded file content
+            memory_size: Estimated bytes the downloaded file holds in memory
+            service: Service name ('drive', 'photos')
+            google_id: Google file or media item ID
+            file_name: File name
+            mime_type: MIME type
+            metadata: Upload metadata
+            file_record: File metadata stored in the state DB
+            stats: Sync statistics to update
+            stats_lock: Lock guarding stats
+        """
+        self._download_slots.acquire()
+        reserved = self.download_budget.acquire(memory_size)
+        
+        def release():
+            self.download_budget.release(reserved)
+            self._download_slots.release()
+        
+        def run():
+            try:
+                file_buffer = download()
+            except Exception as e:
+                release()
+                with stats_lock:
+                    stats['failed'] += 1
+                logger.error(f"Error processing {file_name}: {e}")
+                self._queue_retry(google_id, service, file_record)
+                return
+            
+            try:
+                self._submit_upload(service, google_id, file_buffer, file_name, mime_type, metadata,
+                                    file_record, stats, stats_lock, on_complete=release)
+            except Exception as e:
+                release()
+                with stats_lock:
+                    stats['failed'] += 1
+                logger.error(f"Error queueing {file_name} for upload: {e}")
+                self._queue_retry(google_id, service, file_record)
+        
+        future = self.download_executor.submit(run)
+        with self._pending_lock:
+            self._pending_downloads.add(future)
+        future.add_done_callback(self._discard_pending)
+    
+    def _submit_stream(self, chunks: Callable[[], Iterable[bytes]],
+                       service: str, google_id: str, file_name: str, mime_type: str,
+                       metadata: Dict[str, Any], file_record: Dict[str, Any],
+                       stats: Dict[str, int], stats_lock: threading.Lock):
+        """Stream a file from Google straight to Silo in the background.
+        
+        Memory use is bounded by the download read-ahead regardless of file
+        size. A failed stream cannot be replayed, so the file goes to the
+        retry queue instead.
+        
+        Args:
+            chunks: Callable returning an iterable of file content chunks
+            service: Service name ('drive', 'photos')
+            google_id: Google file or media item ID
+            file_name: File name
+            mime_type: MIME type
+            metadata: Upload metadata
+            file_record: File metadata stored in the state DB
+            stats: Sync statistics to update
+            stats_lock: Lock guarding stats
+        """
+        self._download_slots.acquire()
+        reserved = self.download_budget.acquire(STREAM_MEMORY)
+        
+        def run():
+            try:
+                try:
+                    result = self.silo_client.upload_stream(chunks(), file_name, mime_type, metadata)
+                except Exception as e:
+                    result = UploadResult(success=False, file_name=file_name, error_message=str(e))
+                self._record_upload(result, service, google_id, file_name, file_record, stats, stats_lock)
+            finally:
+                self.download_budget.release(reserved)
+                self._download_slots.release()
+        
+        future = self.download_executor.submit(run)
+        with self._pending_lock:
+            self._pending_downloads.add(future)
+        future.add_done_callback(self._discard_pending)
+    
+    def _discard_pending(self, future: Future):
+        """Forget a finished download future."""
+        with self._pending_lock:
+            self._pending_downloads.discard(future)
+    
+    def _start_workers(self):
+        """Start the upload workers if they are not running yet."""
+        if not self.upload_queue.running:
+            self.upload_queue.start()
+    
+    def _wait_for_transfers(self):
+        """Block until all submitted transfers have finished and their state is saved."""
+        with self._pending_lock:
+            pending = list(self._pending_downloads)
+        wait(pending)
+        self.upload_queue.join()
+        self._flush_state()
+    
+    def _mark_synced(self, google_id: str, service: str, file_record: Dict[str, Any],
+                     silo_file_id: Optional[str]):
+        """Record a synced file; the state manager writes it in the background."""
+        self.state_manager.mark_file_synced(google_id, service, file_record, silo_file_id, self.bucket)
+    
+    def _queue_retry(self, google_id: str, service: str, file_record: Dict[str, Any]):
+        """Add a failed file to the retry queue; the state manager writes it in the background."""
+        self.state_manager.add_to_upload_queue(google_id, service, file_record, self.bucket)
+    
+    def _flush_state(self):
+        """Wait for queued synced and retry records to be written."""
+        self.state_manager.flush()
+    
     def test_connection(self) -> bool:
         """Test connection to Silo server.
         
@@ -106,12 +497,15 @@ class GoogleSiloSync:
         if not self.drive_client:
             self.drive_client = GoogleDriveSync(
                 credentials_path=self.credentials_path,
-                token_path='token_drive.json'
+                token_path='token_drive.json',
+                scopes=self._scopes_for('drive')
             )
         
         workspace_exporter = None
+        exportable_mimes = frozenset()
         if export_workspace_files:
-            workspace_exporter = GoogleWorkspaceExporter(self.drive_client.service)
+            workspace_exporter = self.drive_client.workspace_exporter()
+            exportable_mimes = workspace_exporter.EXPORTABLE_MIMES
         
         # Start sync session
         session_id = self.state_manager.start_sync_session('drive')
@@ -123,93 +517,119 @@ class GoogleSiloSync:
             'skipped': 0,
             'bytes_uploaded': 0
         }
+        stats_lock = threading.Lock()
+        self._start_workers()
+        
+        # Load synced IDs once so the per-file check needs no database query
+        synced_ids = self.state_manager.load_synced_ids('drive')
+        
+        # Content already in Silo (from any service), to skip duplicate uploads
+        self._synced_checksums = self.state_manager.load_synced_checksums()
+        
+        # After a completed sync, only files changed since then are listed
+        change_token = self.state_manager.get_change_token('drive')
+        next_token = None
+        interrupted = False
         
         try:
-            # List all files
-            for file in self.drive_client.list_all_files():
+            if change_token:
+                logger.info("Listing Google Drive changes since the last sync")
+                files = self.drive_client.list_changes(change_token, include_workspace_files=export_workspace_files)
+            else:
+                # Take the token before listing so changes made meanwhile are seen next time
+                next_token = self.drive_client.get_start_page_token()
+                files = self.drive_client.list_all_files(include_workspace_files=export_workspace_files)
+            
+            for file in prefetch(files):
                 if not self.running:
                     logger.info("Sync interrupted by user")
+                    interrupted = True
                     break
                 
-                file_id = file.get('id')
-                file_name = file.get('name')
-                mime_type = file.get('mimeType')
+                # Always present in Drive listings; read once with plain indexing
+                file_id = file['id']
+                file_name = file['name']
+                mime_type = file['mimeType']
                 
                 stats['processed'] += 1
                 
                 # Check if already synced
-                if self.state_manager.is_file_synced(file_id, 'drive'):
+                if file_id in synced_ids:
                     logger.debug(f"Skipping already synced file: {file_name}")
                     stats['skipped'] += 1
                     continue
                 
-                # Handle Google Workspace files
-                if mime_type.startswith('application/vnd.google-apps.'):
-                    if export_workspace_files and workspace_exporter and workspace_exporter.can_export(mime_type):
-                        try:
-                            logger.info(f"Exporting Google Workspace file: {file_name}")
-                            file_buffer = workspace_exporter.export_file(file_id, mime_type, file_name)
-                            
-                            # Update filename with extension
-                            export_ext = workspace_exporter.EXPORT_FORMATS[mime_type]['extension']
-                            export_name = f"{file_name}{export_ext}"
-                            export_mime = workspace_exporter.EXPORT_FORMATS[mime_type]['format']
-                            
-                            # Upload
-                            result = self.silo_client.upload_file(file_buffer, export_name, export_mime)
-                            
-                            if result.success:
-                                stats['uploaded'] += 1
-                                self.state_manager.mark_file_synced(file_id, 'drive', file, result.file_id, self.bucket)
-                            else:
-                                stats['failed'] += 1
-                                logger.error(f"Failed to upload {export_name}: {result.error_message}")
+                # Handle Google Workspace files (exportable ones only when exporting).
+                # Exports run on the download workers like regular downloads, so
+                # Google's slow server-side rendering overlaps with other transfers
+                if mime_type in exportable_mimes:
+                    try:
+                        logger.debug(f"Exporting Google Workspace file: {file_name}")
                         
-                        except Exception as e:
+                        # Update filename with extension
+                        export_format = workspace_exporter.EXPORT_FORMATS[mime_type]
+                        export_name = f"{file_name}{export_format['extension']}"
+                        
+                        self._submit_download(
+                            partial(workspace_exporter.export_file, file_id, mime_type, file_name),
+                            EXPORT_SIZE_ESTIMATE, 'drive', file_id, export_name, export_format['format'],
+                            {'source': 'google_drive'}, file, stats, stats_lock
+                        )
+                    
+                    except Exception as e:
+                        with stats_lock:
                             stats['failed'] += 1
-                            logger.error(f"Error exporting {file_name}: {e}")
-                    else:
-                        logger.debug(f"Skipping non-exportable Google Workspace file: {file_name}")
-                        stats['skipped'] += 1
+                        logger.error(f"Error exporting {file_name}: {e}")
+                        self._queue_retry(file_id, 'drive', file)
                     
                     continue
                 
+                if mime_type.startswith(google_drive.WORKSPACE_MIME_PREFIX):
+                    logger.debug(f"Skipping non-exportable Google Workspace file: {file_name}")
+                    stats['skipped'] += 1
+                    continue
+                
                 # Download and upload regular files
                 try:
                     # Get file path
-                    file_path = self.drive_client.get_file_path(file_id, file_name)
+                    file_path = self.drive_client.get_file_path(file_id, file_name, file.get('parents', []))
                     file['path'] = file_path
                     
-                    logger.info(f"Downloading and uploading: {file_path}")
+                    # Identical content was already uploaded: point this file at it
+                    checksum = file.get('md5Checksum')
+                    if checksum and checksum in self._synced_checksums:
+                        logger.debug(f"Skipping duplicate content: {file_path}")
+                        self._mark_synced(file_id, 'drive', file, self._synced_checksums[checksum])
+                        stats['skipped'] += 1
+                        continue
                     
-                    # Download file
-                    file_buffer = self.drive_client.download_file(file_id, file_name)
+                    logger.debug(f"Downloading and uploading: {file_path}")
                     
-                    # Upload to Silo
-                    result = self.silo_client.upload_file(
-                        file_buffer,
-                        file_name,
-                        mime_type or 'application/octet-stream',
-                        metadata={'source': 'google_drive', 'path': file_path}
-                    )
+                    # Download and upload in the background; large files are
+                    # streamed through without buffering the whole file
+                    file_size = int(file.get('size') or 0)
+                    upload_mime = mime_type or 'application/octet-stream'
+                    upload_metadata = {'source': 'google_drive', 'path': file_path}
                     
-                    if result.success:
-                        stats['uploaded'] += 1
-                        file_buffer.seek(0, 2)
-                        stats['bytes_uploaded'] += file_buffer.tell()
-                        self.state_manager.mark_file_synced(file_id, 'drive', file, result.file_id, self.bucket)
-                        logger.info(f"Successfully synced: {file_name}")
+                    if file_size > STREAM_THRESHOLD:
+                        self._submit_stream(
+                            partial(self.drive_client.iter_download, file_id, file_name,
+                                    expected_md5=checksum),
+                            'drive', file_id, file_name, upload_mime, upload_metadata,
+                            file, stats, stats_lock
+                        )
                     else:
-                        stats['failed'] += 1
-                        logger.error(f"Failed to upload {file_name}: {result.error_message}")
-                        
-                        # Add to upload queue for retry
-                        self.state_manager.add_to_upload_queue(file_id, 'drive', file, self.bucket)
+                        self._submit_download(
+                            partial(self.drive_client.download_file, file_id, file_name),
+                            file_size, 'drive', file_id, file_name, upload_mime, upload_metadata,
+                            file, stats, stats_lock
+                        )
                 
                 except Exception as e:
-                    stats['failed'] += 1
+                    with stats_lock:
+                        stats['failed'] += 1
                     logger.error(f"Error processing {file_name}: {e}")
-                    self.state_manager.add_to_upload_queue(file_id, 'drive', file, self.bucket)
+                    self._queue_retry(file_id, 'drive', file)
                 
                 # Log progress every 10 files
                 if stats['processed'] % 10 == 0:
@@ -217,6 +637,17 @@ class GoogleSiloSync:
                               f"{stats['uploaded']} uploaded, {stats['failed']} failed, "
                               f"{stats['skipped']} skipped")
             
+            # Wait for in-flight transfers before recording the session
+            self._wait_for_transfers()
+            
+            # Advance the changes token only once every listed file was handled;
+            # failures are in the retry queue
+            if not interrupted:
+                if change_token:
+                    next_token = self.drive_client.new_start_page_token
+                if next_token:
+                    self.state_manager.set_change_token('drive', next_token)
+            
             # Complete session
             self.state_manager.complete_sync_session(session_id, stats)
             
@@ -224,8 +655,12 @@ class GoogleSiloSync:
         
         except Exception as e:
             logger.error(f"Google Drive sync failed: {e}", exc_info=True)
+            self._wait_for_transfers()
             self.state_manager.fail_sync_session(session_id, str(e))
             raise
+        
+        finally:
+            self.drive_client.save_folder_cache()
     
     def sync_google_photos(self):
         """Sync Google Photos to Silo."""
@@ -235,7 +670,8 @@ class GoogleSiloSync:
         if not self.photos_client:
             self.photos_client = GooglePhotosSync(
                 credentials_path=self.credentials_path,
-                token_path='token_photos.json'
+                token_path='token_photos.json',
+                scopes=self._scopes_for('photos')
             )
         
         # Start sync session
@@ -248,21 +684,26 @@ class GoogleSiloSync:
             'skipped': 0,
             'bytes_uploaded': 0
         }
+        stats_lock = threading.Lock()
+        self._start_workers()
+        
+        # Load synced IDs once so the per-file check needs no database query
+        synced_ids = self.state_manager.load_synced_ids('photos')
         
         try:
             # List all media items
-            for item in self.photos_client.list_all_media_items():
+            for item in prefetch(self.photos_client.list_all_media_items()):
                 if not self.running:
                     logger.info("Sync interrupted by user")
                     break
                 
-                item_id = item.get('id')
-                file_name = item.get('filename')
+                item_id = item['id']
+                file_name = item['filename']
                 
                 stats['processed'] += 1
                 
                 # Check if already synced
-                if self.state_manager.is_file_synced(item_id, 'photos'):
+                if item_id in synced_ids:
                     logger.debug(f"Skipping already synced photo: {file_name}")
                     stats['skipped'] += 1
                     continue
@@ -271,36 +712,23 @@ class GoogleSiloSync:
                 normalized_item = self.photos_client.normalize_media_item(item)
                 
                 try:
-                    logger.info(f"Downloading and uploading: {file_name}")
-                    
-                    # Download media
-                    file_buffer = self.photos_client.download_media_item(item)
+                    logger.debug(f"Downloading and uploading: {file_name}")
                     
-                    # Upload to Silo
-                    result = self.silo_client.upload_file(
-                        file_buffer,
-                        file_name,
+                    # Download and upload in the background
+                    self._submit_download(
+                        partial(self.photos_client.download_media_item, item),
+                        PHOTOS_SIZE_ESTIMATE,
+                        'photos', item_id, file_name,
                         normalized_item.get('mimeType', 'application/octet-stream'),
-                        metadata={'source': 'google_photos', 'path': normalized_item.get('path')}
+                        {'source': 'google_photos', 'path': normalized_item.get('path')},
+                        normalized_item, stats, stats_lock
                     )
-                    
-                    if result.success:
-                        stats['uploaded'] += 1
-                        file_buffer.seek(0, 2)
-                        stats['bytes_uploaded'] += file_buffer.tell()
-                        self.state_manager.mark_file_synced(item_id, 'photos', normalized_item, result.file_id, self.bucket)
-                        logger.info(f"Successfully synced: {file_name}")
-                    else:
-                        stats['failed'] += 1
-                        logger.error(f"Failed to upload {file_name}: {result.error_message}")
-                        
-                        # Add to upload queue for retry
-                        self.state_manager.add_to_upload_queue(item_id, 'photos', normalized_item, self.bucket)
                 
                 except Exception as e:
-                    stats['failed'] += 1
+                    with stats_lock:
+                        stats['failed'] += 1
                     logger.error(f"Error processing {file_name}: {e}")
-                    self.state_manager.add_to_upload_queue(item_id, 'photos', normalized_item, self.bucket)
+                    self._queue_retry(item_id, 'photos', normalized_item)
                 
                 # Log progress every 10 items
                 if stats['processed'] % 10 == 0:
@@ -308,6 +736,9 @@ class GoogleSiloSync:
                               f"{stats['uploaded']} uploaded, {stats['failed']} failed, "
                               f"{stats['skipped']} skipped")
             
+            # Wait for in-flight transfers before recording the session
+            self._wait_for_transfers()
+            
             # Complete session
             self.state_manager.complete_sync_session(session_id, stats)
             
@@ -315,6 +746,7 @@ class GoogleSiloSync:
         
         except Exception as e:
             logger.error(f"Google Photos sync failed: {e}", exc_info=True)
+            self._wait_for_transfers()
             self.state_manager.fail_sync_session(session_id, str(e))
             raise
     
@@ -322,63 +754,124 @@ class GoogleSiloSync:
         """Process pending uploads from the queue."""
         logger.info("Processing pending uploads from queue")
         
-        pending = self.state_manager.get_pending_uploads()
+        processed = 0
         
-        if not pending:
-            logger.info("No pending uploads")
-            return
-        
-        logger.info(f"Found {len(pending)} pending uploads")
-        
-        # Process each pending upload
-        for item in pending:
+        # Claimed uploads are marked as uploading until their status is updated
+        items = self.state_manager.claim_pending_uploads(QUEUE_BATCH_SIZE)
+        for index, item in enumerate(items):
             if not self.running:
                 logger.info("Queue processing interrupted")
+                self.state_manager.release_claimed_uploads(claimed['id'] for claimed in items[index:])
                 break
             
+            processed += 1
             try:
                 # Initialize appropriate client
                 service = item['service']
+                google_id = item['google_id']
+                upload_name = item['file_name']
+                upload_mime = item['mime_type']
                 if service == 'drive':
                     if not self.drive_client:
-                        self.drive_client = GoogleDriveSync(self.credentials_path, 'token_drive.json')
+                        self.drive_client = GoogleDriveSync(self.credentials_path, 'token_drive.json', scopes=self._scopes_for('drive'))
                     
-                    # Download and upload
-                    file_buffer = self.drive_client.download_file(item['google_id'], item['file_name'])
-                    result = self.silo_client.upload_file(
-                        file_buffer,
-                        item['file_name'],
-                        item['mime_type']
-                    )
+                    if item['mime_type'] in GoogleWorkspaceExporter.EXPORTABLE_MIMES:
+                        # Workspace files are exported again; they change too often to cache
+                        export_format = GoogleWorkspaceExporter.EXPORT_FORMATS[item['mime_type']]
+                        file_buffer = self.drive_client.workspace_exporter().export_file(
+                            google_id, item['mime_type'], item['file_name']
+                        )
+                        upload_name = f"{upload_name}{export_format['extension']}"
+                        upload_mime = export_format['format']
+                    else:
+                        # Reuse a download left by an earlier failed attempt if the file is unchanged
+                        checksum = self.drive_client.get_file_metadata(google_id).get('md5Checksum')
+                        file_buffer = self.download_cache.open(google_id, checksum)
+                        if file_buffer is None:
+                            file_buffer = self.download_cache.fill(
+                                google_id, checksum, partial(self.drive_client.download_file_to_path, google_id)
+                            )
                 
                 elif service == 'photos':
                     if not self.photos_client:
-                        self.photos_client = GooglePhotosSync(self.credentials_path, 'token_photos.json')
+                        self.photos_client = GooglePhotosSync(self.credentials_path, 'token_photos.json', scopes=self._scopes_for('photos'))
                     
-                    # Get media item and download
-                    media_item = self.photos_client.get_media_item_metadata(item['google_id'])
-                    file_buffer = self.photos_client.download_media_item(media_item)
-                    result = self.silo_client.upload_file(
-                        file_buffer,
-                        item['file_name'],
-                        item['mime_type']
-                    )
+                    # Media items are immutable, so any cached copy is current
+                    file_buffer = self.download_cache.open(google_id)
+                    if file_buffer is None:
+                        media_item = self._queued_media_item(item)
+                        file_buffer = self.download_cache.store(
+                            google_id, None, self.photos_client.download_media_item(media_item)
+                        )
                 
                 else:
                     logger.warning(f"Unknown service: {service}")
+                    self.state_manager.update_upload_status(
+                        item['id'], 'failed', error_message=f"Unknown service: {service}"
+                    )
                     continue
                 
+                with file_buffer:
+                    result = self.silo_client.upload_file(
+                        file_buffer,
+                        upload_name,
+                        upload_mime
+                    )
+                
                 # Update status
                 if result.success:
-                    self.state_manager.update_upload_status(item['id'], 'completed', silo_file_id=result.file_id)
-                    logger.info(f"Successfully uploaded queued item: {item['file_name']}")
+                    self.download_cache.discard(google_id)
+                    self.state_manager.update_upload_status(item['id'], 'completed', silo_file_id=result.file_id,
+                                                            google_id=google_id, service=service)
+                    logger.debug(f"Successfully uploaded queued item: {item['file_name']}")
                 else:
-                    self.state_manager.update_upload_status(item['id'], 'failed', error_message=result.error_message)
+                    self._retry_queued_upload(item, result.error_message)
                     logger.error(f"Failed to upload queued item: {item['file_name']}")
             
             except Exception as e:
                 logger.error(f"Error processing queued item {item['file_name']}: {e}")
-                self.state_manager.update_upload_status(item['id'], 'failed', error_message=str(e))
+                self._retry_queued_upload(item, str(e))
+        
+        if processed:
+            logger.info(f"Processed {processed} pending uploads")
+        else:
+            logger.info("No pending uploads")
+    
+    def _retry_queued_upload(self, item: Dict[str, Any], error_message: Optional[str]):
+        """Record a failed attempt at a queued upload.
+        
+        The cached download is kept for the next attempt, and removed once
+        the upload has run out of attempts.
+        
+        Args:
+            item: Upload queue row
+            error_message: Why the attempt failed
+        """
+        status = self.state_manager.update_upload_status(item['id'], 'retrying', error_message=error_message)
+        if status == 'failed':
+            self.download_cache.discard(item['google_id'])
+    
+    def _queued_media_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the media item to download for a queued Photos upload.
+        
+        The baseUrl stored when the item was queued is used while it is still
+        valid; otherwise the media item is fetched again for a fresh one.
+        
+        Args:
+            item: Upload queue row
+            
+        Returns:
+            Media item dictionary accepted by download_media_item()
+        """
+        age = datetime.utcnow() - datetime.fromisoformat(item['created_at'])
+        if item.get('download_url') and age.total_seconds() < PHOTOS_BASE_URL_MAX_AGE:
+            return {
+                'id': item['google_id'],
+                'filename': item['file_name'],
+                'mimeType': item['mime_type'],
+                'baseUrl': item['download_url']
+            }
+        return self.photos_client.get_media_item_metadata(item['google_id'])
     
     def show_stats(self):
         """Display sync statistics."""
@@ -449,6 +942,16 @@ class GoogleSiloSync:
         except Exception as e:
             logger.error(f"Sync failed with error: {e}", exc_info=True)
             return 1
+    
+    def close(self):
+        """Stop transfer workers and release resources held by the service clients."""
+        self.download_executor.shutdown(wait=True)
+        if self.upload_queue.running:
+            self.upload_queue.stop()
+        self.state_manager.close()
+        self.silo_client.close()
+        if self.photos_client:
+            self.photos_client.close()
 
 
 def main():
@@ -511,8 +1014,17 @@ Examples:
     parser.add_argument(
         '--workers',
         type=int,
-        default=3,
-        help='Number of upload worker threads (default: 3)'
+        default=None,
+        help='Number of download/upload worker threads (default: 2x CPU count, '
+             'capped by --max-upload-workers, upload workers tuned at runtime)'
+    )
+    
+    parser.add_argument(
+        '--max-upload-workers',
+        type=int,
+        default=MAX_UPLOAD_WORKERS,
+        help='Upper bound on worker threads; raise it for high-latency links to '
+             f'keep more uploads in flight (default: {MAX_UPLOAD_WORKERS})'
     )
     
     parser.add_argument(
@@ -522,12 +1034,31 @@ Examples:
         help='Maximum upload retry attempts (default: 5)'
     )
     
+    parser.add_argument(
+        '--cache-dir',
+        default='download_cache',
+        help='Directory for files downloaded while retrying queued uploads (default: download_cache)'
+    )
+    
+    parser.add_argument(
+        '--cache-size-gb',
+        type=float,
+        default=10.0,
+        help='Maximum size of the download cache in GB (default: 10)'
+    )
+    
     parser.add_argument(
         '--process-queue',
         action='store_true',
         help='Process pending uploads from queue only'
     )
     
+    parser.add_argument(
+        '--full-sync',
+        action='store_true',
+        help='List every Drive file instead of only changes since the last sync'
+    )
+    
     parser.add_argument(
         '--stats-only',
         action='store_true',
@@ -554,21 +1085,31 @@ Examples:
         credentials_path=args.credentials,
         state_db=args.state_db,
         num_workers=args.workers,
-        max_retries=args.max_retries
+        max_retries=args.max_retries,
+        cache_dir=args.cache_dir,
+        cache_size_gb=args.cache_size_gb,
+        max_upload_workers=args.max_upload_workers
     )
     
-    # Handle special modes
-    if args.stats_only:
-        sync.show_stats()
-        return 0
-    
-    if args.process_queue:
-        sync.process_upload_queue()
-        sync.show_stats()
-        return 0
+    try:
+        # Handle special modes
+        if args.stats_only:
+            sync.show_stats()
+            return 0
+        
+        if args.process_queue:
+            sync.process_upload_queue()
+            sync.show_stats()
+            return 0
+        
+        if args.full_sync:
+            sync.state_manager.clear_change_token('drive')
+        
+        # Run full sync
+        return sync.run()
     
-    # Run full sync
-    return sync.run()
+    finally:
+        sync.close()
 
 
 if __name__ == '__main__':
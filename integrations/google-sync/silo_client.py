@@ -5,19 +5,46 @@ Handles uploading files to Silo API with robust error handling.
 
 import io
 import logging
+import math
+import os
+import random
 import time
+import uuid
+import orjson
 import requests
-from typing import Optional, Dict, Any, BinaryIO
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, BinaryIO, Callable, Iterable, Iterator, List, Set, Tuple
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import threading
-from queue import Queue, Empty
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from dataclasses import dataclass
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
 
+# Metadata value types sent as form fields; other values are skipped
+_SCALAR_TYPES = (str, int, float, bool)
+
+# Upload counters reported by SiloUploadClient.get_stats()
+STAT_KEYS = ('uploads_attempted', 'uploads_succeeded', 'uploads_failed', 'bytes_uploaded', 'rate_limits_hit')
+
+# Upload request pacing (token bucket), only while recovering from a 429
+# response: requests per second start at half of UPLOAD_RATE_MAX, are halved on
+# each further 429 and grow back by UPLOAD_RATE_INCREASE per successful upload.
+# Reaching UPLOAD_RATE_MAX turns pacing off again.
+UPLOAD_RATE_MAX = 50.0
+UPLOAD_RATE_MIN = 0.1
+UPLOAD_RATE_INCREASE = 0.1
+UPLOAD_RATE_BURST = 10
+
+# Block size for sending file-like request bodies (urllib3 defaults to 16 KB)
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
 class UploadStatus(Enum):
     """Upload status enum."""
     PENDING = "pending"
@@ -37,6 +64,83 @@ class UploadResult:
     error_message: Optional[str] = None
     status_code: Optional[int] = None
     retry_after: Optional[int] = None
+    bytes_uploaded: int = 0
+
+
+class _MultipartBody(io.RawIOBase):
+    """Read-only multipart body of a head, a seekable file and a tail.
+    
+    requests sends it with a Content-Length and reads it in blocks, so the
+    file is never copied into memory as a whole.
+    """
+    
+    def __init__(self, head: bytes, file_stream: BinaryIO, file_size: int, tail: bytes):
+        self._parts = [io.BytesIO(head), file_stream, io.BytesIO(tail)]
+        self._length = len(head) + file_size + len(tail)
+        self._position = 0
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def readable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def readinto(self, buffer) -> int:
+        while self._parts:
+            part = self._parts[0]
+            if hasattr(part, 'readinto'):
+                # Read straight into the caller's buffer, avoiding an extra copy
+                size = part.readinto(buffer)
+            else:
+                data = part.read(len(buffer))
+                size = len(data)
+                buffer[:size] = data
+            if size:
+                self._position += size
+                return size
+            self._parts.pop(0)
+        return 0
+
+
+class _UploadAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections send file-like bodies in UPLOAD_BLOCK_SIZE blocks."""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('blocksize', UPLOAD_BLOCK_SIZE)
+        super().init_poolmanager(*args, **kwargs)
+
+
+class _InflightLimit:
+    """Cap on concurrent requests whose size can change while requests are in flight.
+    
+    Used as a context manager around each request. Lowering the limit lets
+    requests already in flight finish; new ones wait until they fit.
+    """
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._changed = threading.Condition()
+    
+    def __enter__(self):
+        with self._changed:
+            self._changed.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        with self._changed:
+            self._active -= 1
+            self._changed.notify()
+    
+    def set_limit(self, limit: int):
+        """Change the limit, waking waiters if it was raised."""
+        with self._changed:
+            self.limit = limit
+            self._changed.notify_all()
 
 
 class SiloUploadClient:
@@ -48,7 +152,9 @@ class SiloUploadClient:
                  max_retries: int = 5,
                  initial_backoff: float = 1.0,
                  max_backoff: float = 300.0,
-                 timeout: int = 300):
+                 timeout: int = 300,
+                 pool_size: int = 10,
+                 max_inflight: Optional[int] = None):
         """Initialize the Silo upload client.
         
         Args:
@@ -58,26 +164,59 @@ class SiloUploadClient:
             initial_backoff: Initial backoff time in seconds
             max_backoff: Maximum backoff time in seconds
             timeout: Request timeout in seconds
+            pool_size: Maximum number of pooled keep-alive connections; should
+                cover the number of threads uploading concurrently
+            max_inflight: Maximum number of upload requests in flight at once
+                (defaults to pool_size). Halved on a 429 response and raised
+                back gradually as uploads succeed
         """
         self.server_url = server_url.rstrip('/')
+        self._upload_url = f"{self.server_url}/api/files/upload"
+        self._status_url = f"{self.server_url}/api/files/pipeline/status"
         self.bucket = bucket
         self.max_retries = max_retries
         self.initial_backoff = initial_backoff
         self.max_backoff = max_backoff
         self.timeout = timeout
         
-        # Rate limiting state
-        self._rate_limit_until = 0
+        # One session for all requests so connections (and TLS handshakes) are
+        # reused across uploads. Retries stay in upload_file, which knows how
+        # to rewind the stream and honour Retry-After.
+        self._session = requests.Session()
+        adapter = _UploadAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        
+        # Rate limiting state (token bucket). Tokens may go negative: each
+        # request reserves the next free slot, so waiting threads are spread
+        # out instead of all waking at once. Times come from the monotonic
+        # clock, so a wall clock adjustment cannot stretch or cut short a backoff.
+        # The rate is None (unlimited) until the server first rate limits us
+        self._rate: Optional[float] = None
+        self._tokens = float(UPLOAD_RATE_BURST)
+        self._last_refill = time.monotonic()
         self._rate_limit_lock = threading.Lock()
         
-        # Statistics
-        self.stats = {
-            'uploads_attempted': 0,
-            'uploads_succeeded': 0,
-            'uploads_failed': 0,
-            'bytes_uploaded': 0,
-            'rate_limits_hit': 0
+        # Concurrent request limit, adjusted together with the rate (AIMD)
+        self.max_inflight = max_inflight or pool_size
+        self._inflight_target = float(self.max_inflight)
+        self._inflight = _InflightLimit(self.max_inflight)
+        
+        # Upload response handling by status code; other codes are client errors
+        self._response_handlers = {
+            200: self._handle_success,
+            429: self._handle_rate_limited,
+            **dict.fromkeys((500, 502, 503, 504), self._handle_server_error),
         }
+        
+        # Backoff jitter source, separate from the shared module-level generator
+        self._rng = random.Random()
+        
+        # Statistics: each thread counts in its own dict, summed on read, so
+        # concurrent uploads never lose increments or contend on a lock
+        self._local_stats = threading.local()
+        self._thread_stats: List[Dict[str, int]] = []
+        self._thread_stats_lock = threading.Lock()
     
     def _calculate_backoff(self, retry_count: int) -> float:
         """Calculate exponential backoff time.
@@ -90,39 +229,174 @@ class SiloUploadClient:
         """
         backoff = min(self.initial_backoff * (2 ** retry_count), self.max_backoff)
         # Add jitter (±20%)
-        import random
-        jitter = backoff * 0.2 * (2 * random.random() - 1)
+        jitter = backoff * 0.2 * (2 * self._rng.random() - 1)
         return max(0.1, backoff + jitter)  # Ensure at least 0.1s
     
-    def _is_rate_limited(self) -> bool:
-        """Check if we're currently rate limited.
+    def _set_rate_limit(self, retry_after: int):
+        """Slow down after a 429 response.
         
-        Returns:
-            True if rate limited, False otherwise
+        Halves the request rate and the concurrent request limit, at most
+        once per backoff period, and pauses the token refill for the
+        Retry-After period.
+        
+        Args:
+            retry_after: Seconds to wait before next request
         """
         with self._rate_limit_lock:
-            return time.time() < self._rate_limit_until
+            now = time.monotonic()
+            if now >= self._last_refill or self._rate is None:
+                self._rate = max(UPLOAD_RATE_MIN, (self._rate or UPLOAD_RATE_MAX) / 2)
+                self._inflight_target = max(1.0, self._inflight_target / 2)
+                self._inflight.set_limit(int(self._inflight_target))
+            self._tokens = min(self._tokens, 0.0)
+            self._last_refill = max(self._last_refill, now + retry_after)
+            self._count('rate_limits_hit')
+            logger.warning("Rate limited. Backing off for %s seconds, then %.1f requests/s with at most %d in flight",
+                           retry_after, self._rate, self._inflight.limit)
     
-    def _set_rate_limit(self, retry_after: int):
-        """Set rate limit backoff period.
+    def _increase_rate(self):
+        """Raise the request rate and concurrent request limit after a successful upload."""
+        # Checked without the lock first: in the common case the rate is
+        # unlimited, the in-flight limit at its maximum and there is nothing to update
+        if self._rate is None and self._inflight_target >= self.max_inflight:
+            return
         
-        Args:
-            retry_after: Seconds to wait before next request
+        with self._rate_limit_lock:
+            if self._rate is not None:
+                self._rate += UPLOAD_RATE_INCREASE
+                if self._rate >= UPLOAD_RATE_MAX:
+                    self._rate = None
+            # One more request in flight per limit's worth of successes
+            self._inflight_target = min(self.max_inflight, self._inflight_target + 1 / self._inflight_target)
+            if int(self._inflight_target) != self._inflight.limit:
+                self._inflight.set_limit(int(self._inflight_target))
+    
+    def _acquire_token(self) -> float:
+        """Reserve a request slot from the token bucket.
+        
+        Returns:
+            Seconds to wait before sending the request
         """
+        # Unlimited until the first 429; reading the attribute needs no lock
+        if self._rate is None:
+            return 0.0
+        
         with self._rate_limit_lock:
-            self._rate_limit_until = time.time() + retry_after
-            self.stats['rate_limits_hit'] += 1
-            logger.warning(f"Rate limited. Backing off for {retry_after} seconds")
-    
-    def _wait_if_rate_limited(self):
-        """Wait if currently rate limited."""
-        if self._is_rate_limited():
-            with self._rate_limit_lock:
-                wait_time = max(0, self._rate_limit_until - time.time())
+            if self._rate is None:
+                return 0.0
+            now = time.monotonic()
+            if now > self._last_refill:
+                self._tokens = min(UPLOAD_RATE_BURST, self._tokens + (now - self._last_refill) * self._rate)
+                self._last_refill = now
+            self._tokens -= 1
+            return (self._last_refill - now) + max(0.0, -self._tokens) / self._rate
+    
+    def _wait_for_token(self):
+        """Wait until the next request may be sent."""
+        wait_time = self._acquire_token()
+        if wait_time > 0:
+            if wait_time >= 1:
+                logger.info("Waiting %.1fs due to rate limiting", wait_time)
+            time.sleep(wait_time)
+    
+    @staticmethod
+    def _parse_retry_after(value: Optional[str], default: int = 60) -> int:
+        """Parse a Retry-After header given as seconds or as an HTTP date.
+        
+        Args:
+            value: Header value, or None if the header is missing
+            default: Seconds to use when the header is missing or invalid
             
-            if wait_time > 0:
-                logger.info(f"Waiting {wait_time:.1f}s due to rate limiting")
-                time.sleep(wait_time)
+        Returns:
+            Seconds to wait
+        """
+        if value is None:
+            return default
+        
+        try:
+            return max(0, int(value))
+        except ValueError:
+            pass
+        
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            logger.warning("Invalid Retry-After header: %r", value)
+            return default
+        
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0, math.ceil((retry_at - datetime.now(timezone.utc)).total_seconds()))
+    
+    def _handle_success(self, response: requests.Response, file_name: str, file_size: int,
+                        retry_count: int) -> Tuple[UploadResult, Optional[float]]:
+        """Handle a 200 response to an upload.
+        
+        Response handlers return the upload result and the seconds to wait
+        before retrying, or None for the backoff if the result is final. The
+        result of a retryable response is returned once retries run out.
+        """
+        result_data = orjson.loads(response.content)
+        file_id = result_data.get('FileId') or result_data.get('fileId')
+        
+        # Update statistics
+        self._increase_rate()
+        self._count('uploads_succeeded')
+        self._count('bytes_uploaded', file_size)
+        
+        logger.debug("Successfully uploaded %s (File ID: %s)", file_name, file_id)
+        
+        return UploadResult(
+            success=True,
+            file_id=file_id,
+            file_name=file_name,
+            status_code=200,
+            bytes_uploaded=file_size
+        ), None
+    
+    def _handle_rate_limited(self, response: requests.Response, file_name: str, file_size: int,
+                             retry_count: int) -> Tuple[UploadResult, Optional[float]]:
+        """Handle a 429 response; the token bucket paces the retry."""
+        retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+        self._set_rate_limit(retry_after)
+        
+        logger.warning("Rate limited on upload of %s. Retry after %ss", file_name, retry_after)
+        
+        return UploadResult(
+            success=False,
+            file_name=file_name,
+            error_message="Max retries exceeded due to rate limiting",
+            status_code=429,
+            retry_after=retry_after
+        ), 0.0
+    
+    def _handle_server_error(self, response: requests.Response, file_name: str, file_size: int,
+                             retry_count: int) -> Tuple[UploadResult, Optional[float]]:
+        """Handle a 5xx response by retrying with backoff."""
+        backoff = self._calculate_backoff(retry_count)
+        logger.warning("Server error %s uploading %s. Retrying in %.1fs",
+                       response.status_code, file_name, backoff)
+        
+        return UploadResult(
+            success=False,
+            file_name=file_name,
+            error_message=f"Server error: {response.status_code}",
+            status_code=response.status_code
+        ), backoff
+    
+    def _handle_client_error(self, response: requests.Response, file_name: str, file_size: int,
+                             retry_count: int) -> Tuple[UploadResult, Optional[float]]:
+        """Handle any other response as a failure that is not retried."""
+        error_msg = f"Upload failed with status {response.status_code}: {response.text[:200]}"
+        logger.error("Upload failed for %s: %s", file_name, error_msg)
+        self._count('uploads_failed')
+        
+        return UploadResult(
+            success=False,
+            file_name=file_name,
+            error_message=error_msg,
+            status_code=response.status_code
+        ), None
     
     def upload_file(self, 
                    file_stream: BinaryIO,
@@ -132,7 +406,8 @@ class SiloUploadClient:
         """Upload a file to Silo with retry logic.
         
         Args:
-            file_stream: File-like object to upload
+            file_stream: File-like object to upload, positioned at the start;
+                it must be seekable so retries can rewind it
             file_name: Name of the file
             mime_type: MIME type of the file
             metadata: Optional metadata dictionary
@@ -140,122 +415,63 @@ class SiloUploadClient:
         Returns:
             UploadResult with upload status and details
         """
-        self.stats['uploads_attempted'] += 1
+        self._count('uploads_attempted')
         retry_count = 0
+        file_size = None
         
         while retry_count <= self.max_retries:
             try:
-                # Wait if rate limited
-                self._wait_if_rate_limited()
-                
-                # Prepare upload
-                file_stream.seek(0)  # Reset stream to beginning
+                # Pace requests to the current rate limit
+                self._wait_for_token()
                 
-                files = {
-                    'file': (file_name, file_stream, mime_type)
-                }
-                
-                # Add metadata as form data if provided
-                data = {}
-                if metadata:
-                    for key, value in metadata.items():
-                        if isinstance(value, (str, int, float, bool)):
-                            data[key] = str(value)
+                # Prepare upload; the size is measured once, not per attempt
+                if file_size is None:
+                    file_size = self._stream_size(file_stream)
+                if retry_count > 0:
+                    file_stream.seek(0)  # Rewind what the failed attempt read
                 
                 # Make upload request
-                url = f"{self.server_url}/api/files/upload"
-                logger.info(f"Uploading {file_name} to {url} (attempt {retry_count + 1}/{self.max_retries + 1})")
-                
-                response = requests.post(
-                    url,
-                    files=files,
-                    data=data,
-                    timeout=self.timeout
-                )
+                logger.debug("Uploading %s to %s (attempt %d/%d)", file_name, self._upload_url, retry_count + 1, self.max_retries + 1)
                 
-                # Check response
-                if response.status_code == 200:
-                    # Success
-                    result_data = response.json()
-                    file_id = result_data.get('FileId') or result_data.get('fileId')
-                    
-                    # Update statistics
-                    file_stream.seek(0, 2)  # Seek to end
-                    file_size = file_stream.tell()
-                    self.stats['uploads_succeeded'] += 1
-                    self.stats['bytes_uploaded'] += file_size
-                    
-                    logger.info(f"Successfully uploaded {file_name} (File ID: {file_id})")
-                    
-                    return UploadResult(
-                        success=True,
-                        file_id=file_id,
-                        file_name=file_name,
-                        status_code=200
+                # The multipart body is read from the stream in blocks while
+                # sending, so the file is never copied into memory as a whole
+                boundary = uuid.uuid4().hex
+                with self._inflight:
+                    response = self._session.post(
+                        self._upload_url,
+                        data=_MultipartBody(
+                            self._multipart_head(boundary, file_name, mime_type, metadata),
+                            file_stream, file_size, self._multipart_tail(boundary)
+                        ),
+                        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+                        timeout=self.timeout
                     )
                 
-                elif response.status_code == 429:
-                    # Rate limited
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    self._set_rate_limit(retry_after)
-                    
-                    logger.warning(f"Rate limited on upload of {file_name}. Retry after {retry_after}s")
-                    retry_count += 1
-                    
-                    if retry_count > self.max_retries:
-                        self.stats['uploads_failed'] += 1
-                        return UploadResult(
-                            success=False,
-                            file_name=file_name,
-                            error_message="Max retries exceeded due to rate limiting",
-                            status_code=429,
-                            retry_after=retry_after
-                        )
-                    
-                    continue
+                # The handler returns the result and the retry backoff, or
+                # None for the backoff if the result is final
+                handler = self._response_handlers.get(response.status_code, self._handle_client_error)
+                result, backoff = handler(response, file_name, file_size, retry_count)
+                if backoff is None:
+                    return result
                 
-                elif response.status_code in (500, 502, 503, 504):
-                    # Server error - retry with backoff
-                    backoff = self._calculate_backoff(retry_count)
-                    logger.warning(f"Server error {response.status_code} uploading {file_name}. "
-                                 f"Retrying in {backoff:.1f}s")
-                    
-                    retry_count += 1
-                    
-                    if retry_count > self.max_retries:
-                        self.stats['uploads_failed'] += 1
-                        return UploadResult(
-                            success=False,
-                            file_name=file_name,
-                            error_message=f"Server error: {response.status_code}",
-                            status_code=response.status_code
-                        )
-                    
-                    time.sleep(backoff)
-                    continue
+                retry_count += 1
+                if retry_count > self.max_retries:
+                    self._count('uploads_failed')
+                    return result
                 
-                else:
-                    # Client error - don't retry
-                    error_msg = f"Upload failed with status {response.status_code}: {response.text[:200]}"
-                    logger.error(f"Upload failed for {file_name}: {error_msg}")
-                    self.stats['uploads_failed'] += 1
-                    
-                    return UploadResult(
-                        success=False,
-                        file_name=file_name,
-                        error_message=error_msg,
-                        status_code=response.status_code
-                    )
+                if backoff:
+                    time.sleep(backoff)
+                continue
             
             except requests.ConnectionError as e:
                 # Connection error - might be offline or server down
                 backoff = self._calculate_backoff(retry_count)
-                logger.warning(f"Connection error uploading {file_name}: {e}. Retrying in {backoff:.1f}s")
+                logger.warning("Connection error uploading %s: %s. Retrying in %.1fs", file_name, e, backoff)
                 
                 retry_count += 1
                 
                 if retry_count > self.max_retries:
-                    self.stats['uploads_failed'] += 1
+                    self._count('uploads_failed')
                     return UploadResult(
                         success=False,
                         file_name=file_name,
@@ -268,12 +484,12 @@ class SiloUploadClient:
             except requests.Timeout as e:
                 # Timeout - retry with backoff
                 backoff = self._calculate_backoff(retry_count)
-                logger.warning(f"Timeout uploading {file_name}: {e}. Retrying in {backoff:.1f}s")
+                logger.warning("Timeout uploading %s: %s. Retrying in %.1fs", file_name, e, backoff)
                 
                 retry_count += 1
                 
                 if retry_count > self.max_retries:
-                    self.stats['uploads_failed'] += 1
+                    self._count('uploads_failed')
                     return UploadResult(
                         success=False,
                         file_name=file_name,
@@ -285,8 +501,8 @@ class SiloUploadClient:
             
             except Exception as e:
                 # Unexpected error
-                logger.error(f"Unexpected error uploading {file_name}: {e}", exc_info=True)
-                self.stats['uploads_failed'] += 1
+                logger.error("Unexpected error uploading %s: %s", file_name, e, exc_info=True)
+                self._count('uploads_failed')
                 
                 return UploadResult(
                     success=False,
@@ -295,13 +511,138 @@ class SiloUploadClient:
                 )
         
         # Should not reach here
-        self.stats['uploads_failed'] += 1
+        self._count('uploads_failed')
         return UploadResult(
             success=False,
             file_name=file_name,
             error_message="Max retries exceeded"
         )
     
+    @staticmethod
+    def _stream_size(file_stream: BinaryIO) -> int:
+        """Get the size of a file stream.
+        
+        Files on disk are sized with one fstat; other streams (in-memory and
+        spooled buffers, whose fileno() would force a rollover to disk) are
+        sized by seeking to the end.
+        """
+        if isinstance(file_stream, (io.BufferedReader, io.FileIO)):
+            return os.fstat(file_stream.fileno()).st_size
+        position = file_stream.tell()
+        file_stream.seek(0, io.SEEK_END)
+        size = file_stream.tell()
+        file_stream.seek(position)
+        return size
+    
+    @staticmethod
+    def _quote_header_param(key: str) -> str:
+        """Escape a form field name or file name for a multipart header."""
+        return key.replace('\\', '\\\\').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+    
+    def _multipart_head(self, boundary: str, file_name: str, mime_type: str,
+                        metadata: Optional[Dict[str, Any]]) -> bytes:
+        """Build the multipart form fields and file part header preceding the file content."""
+        head = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{self._quote_header_param(key)}"\r\n\r\n{value}\r\n'
+            for key, value in (metadata or {}).items()
+            if isinstance(value, _SCALAR_TYPES)
+        ]
+        head.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+                    f'filename="{self._quote_header_param(file_name)}"\r\nContent-Type: {mime_type}\r\n\r\n')
+        return ''.join(head).encode()
+    
+    @staticmethod
+    def _multipart_tail(boundary: str) -> bytes:
+        """Build the multipart terminator following the file content."""
+        return f'\r\n--{boundary}--\r\n'.encode()
+    
+    def upload_stream(self,
+                      chunks: Iterable[bytes],
+                      file_name: str,
+                      mime_type: str = 'application/octet-stream',
+                      metadata: Optional[Dict[str, Any]] = None) -> UploadResult:
+        """Upload a file from an iterable of chunks without buffering it.
+        
+        The multipart body is generated on the fly and sent with chunked
+        transfer encoding, so memory use does not depend on file size. A
+        stream can only be consumed once, so failures are not retried here;
+        the caller should fall back to a buffered retry.
+        
+        Args:
+            chunks: Iterable yielding the file content
+            file_name: Name of the file
+            mime_type: MIME type of the file
+            metadata: Optional metadata dictionary
+            
+        Returns:
+            UploadResult with upload status and details
+        """
+        self._count('uploads_attempted')
+        self._wait_for_token()
+        
+        boundary = uuid.uuid4().hex
+        sent = 0
+        
+        def body() -> Iterator[bytes]:
+            nonlocal sent
+            yield self._multipart_head(boundary, file_name, mime_type, metadata)
+            for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+            yield self._multipart_tail(boundary)
+        
+        logger.debug("Streaming %s to %s", file_name, self._upload_url)
+        
+        try:
+            with self._inflight:
+                response = self._session.post(
+                    self._upload_url,
+                    data=body(),
+                    headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+                    timeout=self.timeout
+                )
+        
+        except Exception as e:
+            logger.error("Error streaming %s: %s", file_name, e)
+            self._count('uploads_failed')
+            return UploadResult(
+                success=False,
+                file_name=file_name,
+                error_message=f"Stream error: {str(e)}"
+            )
+        
+        if response.status_code == 200:
+            result_data = orjson.loads(response.content)
+            file_id = result_data.get('FileId') or result_data.get('fileId')
+            
+            self._increase_rate()
+            self._count('uploads_succeeded')
+            self._count('bytes_uploaded', sent)
+            
+            logger.debug("Successfully streamed %s (%d bytes, File ID: %s)", file_name, sent, file_id)
+            
+            return UploadResult(
+                success=True,
+                file_id=file_id,
+                file_name=file_name,
+                status_code=200,
+                bytes_uploaded=sent
+            )
+        
+        retry_after = None
+        if response.status_code == 429:
+            retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+            self._set_rate_limit(retry_after)
+        
+        self._count('uploads_failed')
+        return UploadResult(
+            success=False,
+            file_name=file_name,
+            error_message=f"Upload failed with status {response.status_code}: {response.text[:200]}",
+            status_code=response.status_code,
+            retry_after=retry_after
+        )
+    
     def test_connection(self) -> bool:
         """Test connection to Silo API.
         
@@ -309,27 +650,52 @@ class SiloUploadClient:
             True if connection successful, False otherwise
         """
         try:
-            url = f"{self.server_url}/api/files/pipeline/status"
-            response = requests.get(url, timeout=10)
+            response = self._session.get(self._status_url, timeout=10)
             
             if response.status_code == 200:
-                logger.info(f"Successfully connected to Silo at {self.server_url}")
+                logger.info("Successfully connected to Silo at %s", self.server_url)
                 return True
             else:
-                logger.warning(f"Connection test failed with status {response.status_code}")
+                logger.warning("Connection test failed with status %s", response.status_code)
                 return False
         
         except Exception as e:
-            logger.error(f"Connection test failed: {e}")
+            logger.error("Connection test failed: %s", e)
             return False
     
+    def close(self):
+        """Release pooled HTTP connections."""
+        self._session.close()
+    
+    def _count(self, key: str, amount: int = 1):
+        """Add to a statistics counter of the calling thread.
+        
+        Args:
+            key: Counter name (one of STAT_KEYS)
+            amount: Amount to add
+        """
+        counters = getattr(self._local_stats, 'counters', None)
+        if counters is None:
+            counters = dict.fromkeys(STAT_KEYS, 0)
+            self._local_stats.counters = counters
+            with self._thread_stats_lock:
+                self._thread_stats.append(counters)
+        counters[key] += amount
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Upload counters summed over all threads."""
+        with self._thread_stats_lock:
+            thread_stats = list(self._thread_stats)
+        return {key: sum(counters[key] for counters in thread_stats) for key in STAT_KEYS}
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get upload statistics.
         
         Returns:
             Statistics dictionary
         """
-        stats = self.stats.copy()
+        stats = self.stats
         if stats['uploads_attempted'] > 0:
             stats['success_rate'] = stats['uploads_succeeded'] / stats['uploads_attempted']
         else:
@@ -338,134 +704,253 @@ class SiloUploadClient:
         return stats
 
 
+# Upload worker autotuning: sampling period and how often the queue depth is checked
+AUTOTUNE_INTERVAL = 10.0
+AUTOTUNE_SAMPLE_INTERVAL = 1.0
+
+
 class UploadQueue:
     """Background upload queue for handling large batches."""
     
     def __init__(self, 
                  client: SiloUploadClient,
                  num_workers: int = 3,
-                 queue_size: int = 1000):
+                 queue_size: int = 1000,
+                 autotune: bool = False,
+                 max_workers: int = 16):
         """Initialize upload queue.
         
         Args:
             client: SiloUploadClient instance
-            num_workers: Number of worker threads
-            queue_size: Maximum queue size
+            num_workers: Number of concurrent uploads (initial count when autotuning)
+            queue_size: Maximum number of uploads waiting to start
+            autotune: Adjust the worker count while running: add a worker when
+                the queue never drains during an interval, halve the workers
+                when the server starts rate limiting
+            max_workers: Upper bound on the worker count
         """
         self.client = client
         self.num_workers = num_workers
-        self.queue = Queue(maxsize=queue_size)
-        self.workers = []
-        self.running = False
-        self.results = []
-        self._results_lock = threading.Lock()
+        self.queue_size = queue_size
+        self.autotune = autotune
+        self.max_workers = max(max_workers, num_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.Semaphore(queue_size)
+        # Guards the worker limit, the waiting/active upload counts and the
+        # uploads not yet finished (whose callbacks have not yet run)
+        self._workers_changed = threading.Condition()
+        self._outstanding: Set[Future] = set()
+        self._waiting = 0
+        self._active = 0
+        self._stop_event = threading.Event()
+        self._autotune_thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether the queue has been started and not stopped."""
+        return self._executor is not None
     
     def start(self):
-        """Start worker threads."""
+        """Start the worker pool."""
         if self.running:
             logger.warning("Upload queue already running")
             return
         
-        self.running = True
-        self.workers = []
+        # The pool is sized for the upper bound; threads are only created as
+        # uploads are submitted, and at most num_workers of them upload at once
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='UploadWorker')
+        self._outstanding = set()
+        self._slots = threading.Semaphore(self.queue_size)
+        self._waiting = 0
+        self._active = 0
+        self._stop_event.clear()
+        
+        if self.autotune:
+            self._autotune_thread = threading.Thread(target=self._autotune, name="UploadAutotune", daemon=True)
+            self._autotune_thread.start()
+        
+        logger.info("Started %d upload workers", self.num_workers)
+    
+    def resize(self, num_workers: int):
+        """Change the number of concurrent uploads while running.
+        
+        When shrinking, uploads already in progress are finished first.
+        
+        Args:
+            num_workers: New number of workers (between 1 and max_workers)
+        """
+        num_workers = max(1, min(num_workers, self.max_workers))
         
-        for i in range(self.num_workers):
-            worker = threading.Thread(target=self._worker, name=f"UploadWorker-{i}")
-            worker.daemon = True
-            worker.start()
-            self.workers.append(worker)
+        with self._workers_changed:
+            if num_workers == self.num_workers:
+                return
+            
+            logger.info("Resized upload workers from %d to %d", self.num_workers, num_workers)
+            self.num_workers = num_workers
+            self._workers_changed.notify_all()
+    
+    def _autotune(self):
+        """Adjust the worker count from queue depth and rate limiting (AIMD)."""
+        rate_limits_seen = self.client.get_stats()['rate_limits_hit']
         
-        logger.info(f"Started {self.num_workers} upload workers")
+        while not self._stop_event.is_set():
+            # The queue is backed up if it never drained during the interval
+            backed_up = True
+            elapsed = 0.0
+            while elapsed < AUTOTUNE_INTERVAL:
+                if self._stop_event.wait(AUTOTUNE_SAMPLE_INTERVAL):
+                    return
+                elapsed += AUTOTUNE_SAMPLE_INTERVAL
+                if self.pending_count() == 0:
+                    backed_up = False
+            
+            rate_limits_hit = self.client.get_stats()['rate_limits_hit']
+            if rate_limits_hit > rate_limits_seen:
+                self.resize(self.num_workers // 2)
+            elif backed_up and self.num_workers < self.max_workers:
+                self.resize(self.num_workers + 1)
+            rate_limits_seen = rate_limits_hit
     
     def stop(self, wait: bool = True):
-        """Stop worker threads.
+        """Stop the worker pool.
         
         Args:
-            wait: Wait for queue to empty before stopping
+            wait: Wait for queued uploads to finish before stopping; otherwise
+                uploads that have not started are cancelled
         """
+        if not self.running:
+            return
+        
         if wait:
             logger.info("Waiting for upload queue to finish...")
-            self.queue.join()
-        
-        self.running = False
+            self.join()
+        else:
+            with self._workers_changed:
+                outstanding = list(self._outstanding)
+            for future in outstanding:
+                future.cancel()
         
-        # Signal workers to stop
-        for _ in self.workers:
-            self.queue.put(None)
+        self._stop_event.set()
+        if self._autotune_thread:
+            self._autotune_thread.join(timeout=5)
+            self._autotune_thread = None
         
-        # Wait for workers
-        for worker in self.workers:
-            worker.join(timeout=5)
+        self._executor.shutdown(wait=wait)
+        self._executor = None
         
         logger.info("Upload queue stopped")
     
-    def _worker(self):
-        """Worker thread function."""
-        while self.running:
-            try:
-                item = self.queue.get(timeout=1)
-                
-                if item is None:  # Stop signal
-                    self.queue.task_done()
-                    break
-                
-                file_stream, file_name, mime_type, metadata = item
-                
-                # Perform upload
-                result = self.client.upload_file(file_stream, file_name, mime_type, metadata)
-                
-                # Store result
-                with self._results_lock:
-                    self.results.append(result)
-                
-                # Close stream
+    def _do_upload(self,
+                   file_stream: BinaryIO,
+                   file_name: str,
+                   mime_type: str,
+                   metadata: Optional[Dict[str, Any]]) -> UploadResult:
+        """Upload one queued file once a worker slot is free, then close its stream."""
+        with self._workers_changed:
+            self._workers_changed.wait_for(lambda: self._active < self.num_workers)
+            self._waiting -= 1
+            self._active += 1
+        self._slots.release()
+        
+        try:
+            return self.client.upload_file(file_stream, file_name, mime_type, metadata)
+        
+        except Exception as e:
+            logger.error("Worker error: %s", e, exc_info=True)
+            raise
+        
+        finally:
+            if hasattr(file_stream, 'close'):
+                file_stream.close()
+            
+            with self._workers_changed:
+                self._active -= 1
+                self._workers_changed.notify_all()
+    
+    def _on_done(self, file_stream: BinaryIO, callback: Optional[Callable[[Future], None]], future: Future):
+        """Run the caller's callback for a finished upload, then stop tracking it.
+        
+        An upload cancelled before it started also has its queue slot
+        released and its stream closed here.
+        """
+        try:
+            if callback:
+                callback(future)
+        except Exception as e:
+            logger.error("Upload callback error: %s", e, exc_info=True)
+        finally:
+            cancelled = future.cancelled()
+            if cancelled:
+                self._slots.release()
                 if hasattr(file_stream, 'close'):
                     file_stream.close()
-                
-                self.queue.task_done()
             
-            except Empty:
-                continue
-            except Exception as e:
-                logger.error(f"Worker error: {e}", exc_info=True)
-                self.queue.task_done()
+            with self._workers_changed:
+                if cancelled:
+                    self._waiting -= 1
+                self._outstanding.discard(future)
+                self._workers_changed.notify_all()
     
     def add_upload(self, 
                   file_stream: BinaryIO,
                   file_name: str,
                   mime_type: str = 'application/octet-stream',
-                  metadata: Optional[Dict[str, Any]] = None):
+                  metadata: Optional[Dict[str, Any]] = None,
+                  callback: Optional[Callable[[Future], None]] = None) -> Future:
         """Add a file to the upload queue.
         
+        Blocks while the queue is full. The stream is closed once the upload
+        has been attempted.
+        
         Args:
             file_stream: File-like object
             file_name: File name
             mime_type: MIME type
             metadata: Optional metadata
+            callback: Optional callable run with the future once the upload
+                finishes; unlike one added to the future, join() waits for it
+            
+        Returns:
+            Future resolving to the UploadResult
         """
         if not self.running:
             raise RuntimeError("Upload queue not running. Call start() first.")
         
-        self.queue.put((file_stream, file_name, mime_type, metadata))
+        self._slots.acquire()
+        with self._workers_changed:
+            self._waiting += 1
+        
+        future = self._executor.submit(self._do_upload, file_stream, file_name, mime_type, metadata)
+        with self._workers_changed:
+            self._outstanding.add(future)
+        future.add_done_callback(partial(self._on_done, file_stream, callback))
+        return future
     
-    def get_results(self) -> list:
-        """Get upload results.
+    def add_uploads(self,
+                    items: Iterable[Tuple[BinaryIO, str, str, Optional[Dict[str, Any]]]]) -> List[Future]:
+        """Add several files to the upload queue.
+        
+        Items are taken from the iterable as queue space frees up, so a
+        generator that opens files lazily keeps only about queue_size of them
+        open. Like add_upload(), this blocks while the queue is full.
         
+        Args:
+            items: (file_stream, file_name, mime_type, metadata) tuples
+            
         Returns:
-            List of UploadResult objects
+            Futures resolving to the UploadResults, in item order
         """
-        with self._results_lock:
-            return self.results.copy()
+        return [self.add_upload(*item) for item in items]
     
-    def clear_results(self):
-        """Clear stored results."""
-        with self._results_lock:
-            self.results.clear()
+    def join(self):
+        """Block until every queued upload has been attempted and its callback has run."""
+        with self._workers_changed:
+            self._workers_changed.wait_for(lambda: not self._outstanding)
     
     def pending_count(self) -> int:
         """Get number of pending uploads.
         
         Returns:
-            Number of items in queue
+            Number of uploads waiting to start
         """
-        return self.queue.qsize()
+        return self._waiting
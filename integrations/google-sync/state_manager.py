@@ -4,33 +4,181 @@ Tracks synced files, pending uploads, and maintains resumable state.
 """
 
 import sqlite3
-import json
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Set, Tuple
 from pathlib import Path
 from contextlib import contextmanager
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
+# A file to record: (google_id, service, file_info, silo_file_id, bucket)
+SyncedFileRow = Tuple[str, str, Dict[str, Any], Optional[str], Optional[str]]
+
+# A file to queue for retry: (google_id, service, file_info, bucket)
+QueuedFileRow = Tuple[str, str, Dict[str, Any], str]
+
+# Background writer: maximum queued writes per transaction, and how long to
+# wait for more writes before committing
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_INTERVAL = 0.1
+
+# Per-connection SQLite page cache (negative: KiB) and memory-mapped I/O size
+SQLITE_CACHE_SIZE = -64 * 1024
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+# Rows fetched from SQLite at a time when streaming query results
+FETCH_CHUNK_SIZE = 100
+
+# Days a failed upload stays in upload_queue before it is moved to the
+# failed_uploads archive
+FAILED_UPLOAD_RETENTION_DAYS = 7
+
+# Hours an upload stays claimed before it may be claimed again, on the
+# assumption that the process which claimed it stopped before finishing
+UPLOAD_CLAIM_TIMEOUT_HOURS = 6
+
+# Times a queued upload is attempted before it is marked failed for good
+MAX_UPLOAD_ATTEMPTS = 8
+
+# Minutes before a queued upload that failed is retried, doubling after each
+# further failed attempt
+UPLOAD_RETRY_BACKOFF_MINUTES = 15
+
+# Seconds between database reads of an endpoint's rate limit backoff while it
+# is not backing off, to see backoffs set by other processes
+RATE_LIMIT_RECHECK_INTERVAL = 1.0
+
+# file_info keys stored in their own columns; the metadata JSON column holds
+# only the remaining keys
+SYNCED_FILE_FIELDS = frozenset({'name', 'path', 'mimeType', 'size', 'modifiedTime', 'md5Checksum'})
+QUEUED_FILE_FIELDS = frozenset({'name', 'path', 'mimeType', 'size'})
+
+# Upserts update existing rows in place; INSERT OR REPLACE would delete and
+# re-insert them, allocating a new id. Re-queuing a file resets its retry state.
+SYNCED_FILE_UPSERT = """
+    ON CONFLICT(google_id) DO UPDATE SET
+        service = excluded.service, file_name = excluded.file_name,
+        file_path = excluded.file_path, mime_type = excluded.mime_type,
+        file_size = excluded.file_size, modified_time = excluded.modified_time,
+        silo_file_id = excluded.silo_file_id, checksum = excluded.checksum,
+        bucket = excluded.bucket, synced_at = excluded.synced_at,
+        metadata = excluded.metadata
+"""
+
+SYNCED_FILE_SQL = """
+    INSERT INTO synced_files 
+    (google_id, service, file_name, file_path, mime_type, file_size, 
+     modified_time, silo_file_id, checksum, bucket, synced_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+""" + SYNCED_FILE_UPSERT
+
+# Moves a queued file into synced_files; the queue keeps modifiedTime and
+# md5Checksum in its metadata JSON, synced_files has columns for them
+COMPLETED_UPLOAD_SQL = """
+    INSERT INTO synced_files
+    (google_id, service, file_name, file_path, mime_type, file_size,
+     modified_time, silo_file_id, checksum, bucket, synced_at, metadata)
+    SELECT google_id, service, file_name, file_path, mime_type, file_size,
+           COALESCE(json_extract(metadata, '$.modifiedTime'), ''), ?,
+           COALESCE(json_extract(metadata, '$.md5Checksum'), ''), bucket, ?,
+           json_remove(metadata, '$.modifiedTime', '$.md5Checksum')
+    FROM upload_queue WHERE id = ?
+""" + SYNCED_FILE_UPSERT
+
+# Per-item statements run by update_upload_status
+QUEUED_FILE_KEY_SQL = "SELECT google_id, service FROM upload_queue WHERE id = ?"
+DELETE_QUEUED_FILE_SQL = "DELETE FROM upload_queue WHERE id = ?"
+UPDATE_QUEUED_FILE_SQL = """
+    UPDATE upload_queue
+    SET status = CASE WHEN ? = 'retrying' AND retry_count + 1 >= ? THEN 'failed' ELSE ? END,
+        last_error = ?, last_attempt_at = ?, retry_count = retry_count + 1
+    WHERE id = ?
+    RETURNING status
+"""
+
+QUEUED_FILE_SQL = """
+    INSERT INTO upload_queue
+    (google_id, service, file_name, file_path, mime_type, file_size,
+     download_url, bucket, status, created_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)
+    ON CONFLICT(google_id, service) DO UPDATE SET
+        file_name = excluded.file_name, file_path = excluded.file_path,
+        mime_type = excluded.mime_type, file_size = excluded.file_size,
+        download_url = excluded.download_url, bucket = excluded.bucket,
+        status = 'pending', retry_count = 0, last_error = NULL,
+        created_at = excluded.created_at, last_attempt_at = NULL,
+        metadata = excluded.metadata
+"""
+
+
 class StateManager:
     """Manages persistent state for the Google sync agent."""
     
     def __init__(self, db_path: str = "google_sync_state.db"):
         """Initialize the state manager with a SQLite database.
         
+        Synced-file and upload-queue writes, the ones made per file from
+        transfer threads, are applied in batches by a single background
+        writer thread, so those threads never contend for SQLite's write lock.
+        Other writes are made directly, one at a time.
+        
         Args:
-            db_path: Path to the SQLite database file
+            db_path: Path to the SQLite database file, or ':memory:' for a
+                database that lasts until close()
         """
         self.db_path = db_path
+        
+        # A plain in-memory database is private to the connection that opens
+        # it; a uniquely named shared-cache one is seen by every connection
+        self._in_memory = db_path == ':memory:'
+        if self._in_memory:
+            self._database = f"file:state-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            self._database = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        
+        # In-memory copies of state read on hot paths, kept up to date by this
+        # class's own writes: synced IDs per service (loaded on first use) and
+        # rate limit backoffs per endpoint, as (deadline, time of the next
+        # database read) in Unix time
+        self._synced_ids: Dict[str, Set[str]] = {}
+        self._synced_ids_lock = threading.Lock()
+        # Synced ID changes made while a service's set is loading, by ID
+        # (True when added, False when dropped), applied once it is loaded
+        self._synced_id_changes: Dict[str, Dict[str, bool]] = {}
+        self._backoff_until: Dict[str, Tuple[float, float]] = {}
+        
+        # SQLite allows one writer at a time; writers queue here instead of
+        # waiting in SQLite's busy handler, which polls with growing sleeps
+        self._write_lock = threading.BoundedSemaphore(1)
+        
         self._init_db()
+        
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="StateWriter", daemon=True)
+        self._writer.start()
     
     def _init_db(self):
         """Initialize the database schema."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
+            # WAL lets readers proceed during writes and needs fewer fsyncs;
+            # the setting is stored in the database file. In-memory databases
+            # cannot use it.
+            if not self._in_memory:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            
             # Table for tracking synced files
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS synced_files (
@@ -73,6 +221,18 @@ class StateManager:
                 )
             """)
             
+            # Archive of failed uploads, kept out of upload_queue so the queue
+            # only holds work that can still be retried
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS failed_uploads AS
+                SELECT * FROM upload_queue WHERE 0
+            """)
+            
+            # Indexes for per-service listings, stats and pending-upload lookups
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_synced_service ON synced_files(service)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_queue_status_created ON upload_queue(status, created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_queue_service_status ON upload_queue(service, status)")
+            
             # Table for sync sessions
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS sync_sessions (
@@ -101,19 +261,231 @@ class StateManager:
                 )
             """)
             
-            conn.commit()
+            # Table for incremental sync tokens (e.g. Drive changes page tokens)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS change_tokens (
+                    service TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            
             logger.info(f"Database initialized at {self.db_path}")
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a database connection."""
+        # Closed from whichever thread calls close(), hence check_same_thread;
+        # each connection is still only used by the thread that opened it
+        # isolation_level=None: statements run in autocommit mode unless inside
+        # an explicit _transaction()
+        conn = sqlite3.connect(self._database, check_same_thread=False, cached_statements=256,
+                               isolation_level=None, uri=self._in_memory)
+        if self._in_memory:
+            # Shared-cache connections lock whole tables and fail instead of
+            # waiting on a conflict; writes are already serialized by
+            # _write_lock, and this keeps reads from taking table locks
+            conn.execute("PRAGMA read_uncommitted=1")
+        # Safe with WAL: a power loss may drop the last commits but never corrupts
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        return conn
+    
+    @staticmethod
+    def _dict_rows(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        """Fetch the remaining rows of a query as dictionaries keyed by column name.
+        
+        Connections return plain tuples, which are cheaper to build than
+        sqlite3.Row; this is for the few queries whose rows leave the class.
+        """
+        keys = [column[0] for column in cursor.description]
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+    
     @contextmanager
     def _get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Context manager yielding the calling thread's database connection.
+        
+        Each thread opens one connection on first use and keeps it until
+        close(), so calls do not pay for opening the database. Changes left
+        uncommitted when the block raises are rolled back.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        
         try:
             yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+    
+    @contextmanager
+    def _transaction(self):
+        """Context manager running a block as one write transaction.
+        
+        Takes the write lock and begins with BEGIN IMMEDIATE, so SQLite's
+        write lock is held from the start instead of being upgraded from a
+        read lock partway through. Commits when the block completes and rolls
+        back when it raises.
+        
+        Yields:
+            The calling thread's database connection
+        """
+        with self._write_lock, self._get_connection() as conn:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+    
+    @contextmanager
+    def _get_cursor(self):
+        """Context manager yielding a connection and cursor for a long-lived read.
+        
+        The connection is opened for this read only and closed afterwards, so
+        with a database file its rows come from one snapshot even while the
+        calling thread writes through its own connection.
+        """
+        conn = self._connect()
+        try:
+            yield conn, conn.cursor()
         finally:
             conn.close()
     
+    def _write(self, sql: str, params: List[Tuple[Any, ...]]):
+        """Queue a write for the background writer.
+        
+        Args:
+            sql: Statement to execute once per parameter tuple
+            params: Parameter tuples
+        """
+        self._write_queue.put((sql, params))
+    
+    def _writer_loop(self):
+        """Apply queued writes, committing up to WRITE_BATCH_SIZE at a time."""
+        with self._get_connection() as conn:
+            while True:
+                batch = [self._write_queue.get()]
+                deadline = time.monotonic() + WRITE_BATCH_INTERVAL
+                while batch[-1] is not None and len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        batch.append(self._write_queue.get(timeout=max(0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                
+                # Consecutive writes of the same statement (typically one row
+                # each) are merged into a single executemany call
+                statements: List[Tuple[str, List[Tuple[Any, ...]]]] = []
+                for item in batch:
+                    if item is None:
+                        continue
+                    sql, params = item
+                    if statements and statements[-1][0] == sql:
+                        statements[-1][1].extend(params)
+                    else:
+                        statements.append((sql, list(params)))
+                
+                try:
+                    with self._transaction():
+                        for sql, params in statements:
+                            conn.executemany(sql, params)
+                except Exception as e:
+                    logger.warning(f"Failed to write {len(batch)} queued state updates, retrying one at a time: {e}")
+                    self._write_rows(conn, statements)
+                finally:
+                    for _ in batch:
+                        self._write_queue.task_done()
+                
+                if batch[-1] is None:
+                    return
+    
+    def _write_rows(self, conn: sqlite3.Connection, statements: List[Tuple[str, List[Tuple[Any, ...]]]]):
+        """Apply writes one row per transaction, skipping only the rows that fail.
+        
+        Args:
+            conn: The writer thread's connection
+            statements: (sql, parameter tuples) pairs, in order
+        """
+        for sql, params in statements:
+            for row in params:
+                try:
+                    with self._transaction():
+                        conn.execute(sql, row)
+                except Exception as e:
+                    logger.error(f"Dropped a queued state update for {row[0]}: {e}")
+                    if sql == SYNCED_FILE_SQL:
+                        # Not recorded, so the file is uploaded again by a later sync
+                        self._change_synced_ids([(row[0], row[1])], False)
+    
+    def flush(self):
+        """Wait until all queued writes have been committed.
+        
+        Read methods call this first, so they always see earlier writes.
+        """
+        self._write_queue.join()
+    
+    def close(self):
+        """Commit queued writes, stop the background writer and close all connections."""
+        if self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join()
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+    
+    def _synced_id_set(self, service: str) -> Set[str]:
+        """Get the cached set of synced IDs for a service, loading it on first use."""
+        with self._synced_ids_lock:
+            synced_ids = self._synced_ids.get(service)
+            if synced_ids is not None:
+                return synced_ids
+            changes = self._synced_id_changes.setdefault(service, {})
+        
+        # Load without holding the lock: flush() waits for the writer, which
+        # takes the lock to drop IDs whose writes failed
+        self.flush()
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                "SELECT google_id FROM synced_files WHERE service = ?",
+                (service,)
+            )
+            loaded_ids = {row[0] for row in cursor}
+        
+        with self._synced_ids_lock:
+            # Another thread loading the same service may have published first
+            synced_ids = self._synced_ids.get(service)
+            if synced_ids is None:
+                for google_id, synced in changes.items():
+                    if synced:
+                        loaded_ids.add(google_id)
+                    else:
+                        loaded_ids.discard(google_id)
+                synced_ids = self._synced_ids[service] = loaded_ids
+                self._synced_id_changes.pop(service, None)
+            return synced_ids
+    
+    def _change_synced_ids(self, rows: Iterable[Tuple[str, str]], synced: bool):
+        """Add or drop (google_id, service) pairs in the synced ID sets.
+        
+        Sets not loaded yet are left alone, except that changes to a set
+        being loaded are kept to apply once it is.
+        """
+        with self._synced_ids_lock:
+            for google_id, service in rows:
+                synced_ids = self._synced_ids.get(service)
+                if synced_ids is not None:
+                    if synced:
+                        synced_ids.add(google_id)
+                    else:
+                        synced_ids.discard(google_id)
+                elif service in self._synced_id_changes:
+                    self._synced_id_changes[service][google_id] = synced
+    
     def is_file_synced(self, google_id: str, service: str) -> bool:
         """Check if a file has already been synced.
         
@@ -124,19 +496,59 @@ class StateManager:
         Returns:
             True if file is already synced, False otherwise
         """
+        return google_id in self._synced_id_set(service)
+    
+    def are_files_synced(self, google_ids: Iterable[str], service: str) -> Set[str]:
+        """Find which of the given files have already been synced.
+        
+        Args:
+            google_ids: Google file/item IDs
+            service: Service name (drive, photos, etc.)
+            
+        Returns:
+            Set of the given IDs that are synced
+        """
+        synced_ids = self._synced_id_set(service)
+        return {google_id for google_id in google_ids if google_id in synced_ids}
+    
+    def load_synced_ids(self, service: str) -> Set[str]:
+        """Load the IDs of all files already synced for a service.
+        
+        Lets a sync check each listed file in memory instead of querying the
+        database per file.
+        
+        Args:
+            service: Service name (drive, photos, etc.)
+            
+        Returns:
+            Set of synced Google file/item IDs (a copy the caller may keep)
+        """
+        synced_ids = self._synced_id_set(service)
+        with self._synced_ids_lock:
+            return set(synced_ids)
+    
+    def load_synced_checksums(self) -> Dict[str, str]:
+        """Load the content checksums of all synced files, across services.
+        
+        Lets a sync skip uploading a file whose content is already in Silo.
+        
+        Returns:
+            Dictionary mapping MD5 checksum to the Silo file ID holding that content
+        """
+        self.flush()
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT COUNT(*) as count FROM synced_files WHERE google_id = ? AND service = ?",
-                (google_id, service)
+            cursor = conn.execute(
+                "SELECT checksum, silo_file_id FROM synced_files "
+                "WHERE checksum != '' AND silo_file_id IS NOT NULL"
             )
-            result = cursor.fetchone()
-            return result['count'] > 0
+            return dict(cursor.fetchall())
     
     def mark_file_synced(self, google_id: str, service: str, file_info: Dict[str, Any], 
                          silo_file_id: Optional[str] = None, bucket: Optional[str] = None):
         """Mark a file as successfully synced.
         
+        The write is queued for the background writer; call flush() to wait for it.
+        
         Args:
             google_id: Google file/item ID
             service: Service name
@@ -144,62 +556,130 @@ class StateManager:
             silo_file_id: Silo file ID (if available)
             bucket: Bucket name where file was uploaded
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO synced_files 
-                (google_id, service, file_name, file_path, mime_type, file_size, 
-                 modified_time, silo_file_id, checksum, bucket, synced_at, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                google_id,
-                service,
-                file_info.get('name', ''),
-                file_info.get('path', ''),
-                file_info.get('mimeType', ''),
-                file_info.get('size', 0),
-                file_info.get('modifiedTime', ''),
-                silo_file_id,
-                file_info.get('md5Checksum', ''),
-                bucket,
-                datetime.utcnow().isoformat(),
-                json.dumps(file_info)
-            ))
-            conn.commit()
-            logger.debug(f"Marked {google_id} as synced")
+        self.mark_files_synced_batch([(google_id, service, file_info, silo_file_id, bucket)])
+        logger.debug(f"Marked {google_id} as synced")
+    
+    def mark_files_synced_batch(self, rows: List[SyncedFileRow]):
+        """Mark several files as synced.
+        
+        The write is queued for the background writer; call flush() to wait for it.
+        
+        Args:
+            rows: Tuples of (google_id, service, file_info, silo_file_id, bucket)
+        """
+        if not rows:
+            return
+        
+        self._change_synced_ids(((google_id, service) for google_id, service, _, _, _ in rows), True)
+        
+        synced_at = datetime.utcnow().isoformat()
+        self._write(SYNCED_FILE_SQL, [(
+            google_id,
+            service,
+            file_info.get('name', ''),
+            file_info.get('path', ''),
+            file_info.get('mimeType', ''),
+            file_info.get('size', 0),
+            file_info.get('modifiedTime', ''),
+            silo_file_id,
+            file_info.get('md5Checksum', ''),
+            bucket,
+            synced_at,
+            self._extra_metadata(file_info, SYNCED_FILE_FIELDS)
+        ) for google_id, service, file_info, silo_file_id, bucket in rows])
     
     def add_to_upload_queue(self, google_id: str, service: str, file_info: Dict[str, Any], 
                            bucket: str, download_url: Optional[str] = None):
         """Add a file to the upload queue.
         
+        The write is queued for the background writer; call flush() to wait for it.
+        
         Args:
             google_id: Google file/item ID
             service: Service name
             file_info: File metadata
             bucket: Target bucket name
-            download_url: Direct download URL (if available)
+            download_url: Direct download URL (default: the Photos baseUrl in
+                file_info, if any)
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        self._write(QUEUED_FILE_SQL, [
+            self._queued_file_params(google_id, service, file_info, bucket, download_url,
+                                     datetime.utcnow().isoformat())
+        ])
+        logger.debug(f"Added {google_id} to upload queue")
+    
+    def add_to_upload_queue_batch(self, rows: List[QueuedFileRow]):
+        """Add several files to the upload queue.
+        
+        The Photos baseUrl in file_info, if any, is stored as the download URL.
+        The write is queued for the background writer; call flush() to wait for it.
+        
+        Args:
+            rows: Tuples of (google_id, service, file_info, bucket)
+        """
+        if not rows:
+            return
+        
+        created_at = datetime.utcnow().isoformat()
+        self._write(QUEUED_FILE_SQL, [
+            self._queued_file_params(google_id, service, file_info, bucket, None, created_at)
+            for google_id, service, file_info, bucket in rows
+        ])
+    
+    @staticmethod
+    def _queued_file_params(google_id: str, service: str, file_info: Dict[str, Any], bucket: str,
+                            download_url: Optional[str], created_at: str) -> Tuple[Any, ...]:
+        """Build the QUEUED_FILE_SQL parameters for one file."""
+        return (
+            google_id,
+            service,
+            file_info.get('name', ''),
+            file_info.get('path', ''),
+            file_info.get('mimeType', ''),
+            file_info.get('size', 0),
+            download_url or file_info.get('baseUrl'),
+            bucket,
+            created_at,
+            StateManager._extra_metadata(file_info, QUEUED_FILE_FIELDS)
+        )
+    
+    @staticmethod
+    def _extra_metadata(file_info: Dict[str, Any], stored_fields: frozenset) -> str:
+        """Serialize the file_info keys that have no column of their own as compact JSON."""
+        # orjson writes the same compact JSON as json.dumps(separators=(',', ':')),
+        # several times faster; this runs once per recorded or queued file
+        return orjson.dumps(
+            {key: value for key, value in file_info.items() if key not in stored_fields}
+        ).decode()
+    
+    def iter_pending_uploads(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over pending uploads in the queue, oldest first.
+        
+        Rows are fetched in chunks as the caller consumes them rather than all
+        at once. Uploads queued or updated while iterating are not seen.
+        
+        Args:
+            limit: Maximum number of items to return, or None for all
+            
+        Yields:
+            Pending upload items
+        """
+        self.flush()
+        with self._get_cursor() as (conn, cursor):
             cursor.execute("""
-                INSERT OR REPLACE INTO upload_queue
-                (google_id, service, file_name, file_path, mime_type, file_size,
-                 download_url, bucket, status, created_at, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)
-            """, (
-                google_id,
-                service,
-                file_info.get('name', ''),
-                file_info.get('path', ''),
-                file_info.get('mimeType', ''),
-                file_info.get('size', 0),
-                download_url,
-                bucket,
-                datetime.utcnow().isoformat(),
-                json.dumps(file_info)
-            ))
-            conn.commit()
-            logger.debug(f"Added {google_id} to upload queue")
+                SELECT * FROM upload_queue 
+                WHERE status IN ('pending', 'retrying')
+                ORDER BY created_at ASC
+                LIMIT ?
+            """, (-1 if limit is None else limit,))
+            
+            keys = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(FETCH_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(keys, row))
     
     def get_pending_uploads(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get pending uploads from the queue.
@@ -210,57 +690,139 @@ class StateManager:
         Returns:
             List of pending upload items
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM upload_queue 
-                WHERE status = 'pending' OR status = 'retrying'
-                ORDER BY created_at ASC
-                LIMIT ?
-            """, (limit,))
+        return list(self.iter_pending_uploads(limit))
+    
+    def claim_pending_uploads(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Claim the oldest pending uploads for retrying.
+        
+        The uploads are marked 'uploading' by the same statement that returns
+        them, so an upload is never claimed twice while another process is
+        working on it. Uploads claimed more than UPLOAD_CLAIM_TIMEOUT_HOURS
+        ago were left by a process that stopped, and are claimed again.
+        Retrying uploads are claimed once their backoff has passed.
+        
+        Args:
+            limit: Maximum number of items to claim
             
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+        Returns:
+            Claimed upload items, oldest first
+        """
+        now = datetime.utcnow()
+        stale = (now - timedelta(hours=UPLOAD_CLAIM_TIMEOUT_HOURS)).isoformat()
+        self.flush()
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE upload_queue
+                SET status = 'uploading', last_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM upload_queue
+                    WHERE status = 'pending'
+                       OR (status = 'retrying' AND last_attempt_at < strftime(
+                           '%Y-%m-%dT%H:%M:%f', ?, '-' || (? << (retry_count - 1)) || ' minutes'
+                       ))
+                       OR (status = 'uploading' AND last_attempt_at < ?)
+                    ORDER BY created_at ASC
+                    LIMIT ?
+                )
+                RETURNING *
+            """, (now.isoformat(), now.isoformat(), UPLOAD_RETRY_BACKOFF_MINUTES, stale, limit))
+            items = self._dict_rows(cursor)
+        
+        # RETURNING does not keep the subquery's order
+        items.sort(key=lambda item: item['created_at'])
+        return items
     
     def update_upload_status(self, queue_id: int, status: str, 
                             error_message: Optional[str] = None,
-                            silo_file_id: Optional[str] = None):
+                            silo_file_id: Optional[str] = None, *,
+                            google_id: Optional[str] = None,
+                            service: Optional[str] = None) -> Optional[str]:
         """Update the status of an upload queue item.
         
         Args:
             queue_id: Queue item ID
-            status: New status (pending, uploading, completed, failed)
+            status: New status (pending, uploading, retrying, completed,
+                failed); 'retrying' becomes 'failed' once the item has been
+                attempted MAX_UPLOAD_ATTEMPTS times
             error_message: Error message if failed
             silo_file_id: Silo file ID if upload succeeded
+            google_id: Google file ID of the item, if known; with service,
+                saves looking it up when the item completes
+            service: Service name of the item, if known
+        
+        Returns:
+            The status the item was left in, or None if it is no longer queued
         """
-        with self._get_connection() as conn:
+        moved = None
+        new_status = None
+        with self._transaction() as conn:
             cursor = conn.cursor()
             
             if status == 'completed' and silo_file_id:
-                # Move to synced_files table
-                cursor.execute("SELECT * FROM upload_queue WHERE id = ?", (queue_id,))
-                item = cursor.fetchone()
-                if item:
-                    file_info = json.loads(item['metadata']) if item['metadata'] else {}
-                    self.mark_file_synced(
-                        item['google_id'],
-                        item['service'],
-                        file_info,
-                        silo_file_id,
-                        item['bucket']
-                    )
-                    # Remove from queue
-                    cursor.execute("DELETE FROM upload_queue WHERE id = ?", (queue_id,))
+                # Move to synced_files table, in the same transaction as the delete
+                if google_id and service:
+                    key = (google_id, service)
+                else:
+                    key = cursor.execute(QUEUED_FILE_KEY_SQL, (queue_id,)).fetchone()
+                if key:
+                    cursor.execute(COMPLETED_UPLOAD_SQL, (silo_file_id, datetime.utcnow().isoformat(), queue_id))
+                    if cursor.rowcount:
+                        moved = key
+                        cursor.execute(DELETE_QUEUED_FILE_SQL, (queue_id,))
             else:
                 # Update status
-                cursor.execute("""
-                    UPDATE upload_queue
-                    SET status = ?, last_error = ?, last_attempt_at = ?,
-                        retry_count = retry_count + 1
-                    WHERE id = ?
-                """, (status, error_message, datetime.utcnow().isoformat(), queue_id))
+                row = cursor.execute(UPDATE_QUEUED_FILE_SQL, (
+                    status, MAX_UPLOAD_ATTEMPTS, status,
+                    error_message, datetime.utcnow().isoformat(), queue_id
+                )).fetchone()
+                new_status = row[0] if row else None
+        
+        if moved:
+            self._change_synced_ids([moved], True)
+            return 'completed'
+        return new_status
+    
+    def release_claimed_uploads(self, queue_ids: Iterable[int]):
+        """Make claimed uploads pending again without counting an attempt.
+        
+        Args:
+            queue_ids: IDs of queue items claimed but not processed
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE upload_queue SET status = 'pending' WHERE id = ? AND status = 'uploading'",
+                [(queue_id,) for queue_id in queue_ids]
+            )
+    
+    def archive_failed_uploads(self, older_than_days: int = FAILED_UPLOAD_RETENTION_DAYS) -> int:
+        """Move failed uploads last attempted too long ago to the failed_uploads table.
+        
+        Archived uploads are no longer counted in get_sync_stats().
+        
+        Args:
+            older_than_days: Minimum days since the last upload attempt
             
-            conn.commit()
+        Returns:
+            Number of uploads archived
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat()
+        
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO failed_uploads
+                SELECT * FROM upload_queue
+                WHERE status = 'failed' AND last_attempt_at < ?
+            """, (cutoff,))
+            cursor.execute("""
+                DELETE FROM upload_queue
+                WHERE status = 'failed' AND last_attempt_at < ?
+            """, (cutoff,))
+            archived = cursor.rowcount
+        
+        if archived:
+            logger.info(f"Archived {archived} failed uploads")
+        return archived
     
     def start_sync_session(self, service: str) -> int:
         """Start a new sync session.
@@ -271,13 +833,12 @@ class StateManager:
         Returns:
             Session ID
         """
-        with self._get_connection() as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO sync_sessions (service, started_at, status)
                 VALUES (?, ?, 'running')
             """, (service, datetime.utcnow().isoformat()))
-            conn.commit()
             return cursor.lastrowid
     
     def complete_sync_session(self, session_id: int, stats: Dict[str, Any]):
@@ -287,7 +848,7 @@ class StateManager:
             session_id: Session ID
             stats: Statistics dictionary
         """
-        with self._get_connection() as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE sync_sessions
@@ -303,7 +864,8 @@ class StateManager:
                 stats.get('bytes_uploaded', 0),
                 session_id
             ))
-            conn.commit()
+        
+        self.archive_failed_uploads()
     
     def fail_sync_session(self, session_id: int, error_message: str):
         """Mark a sync session as failed.
@@ -312,14 +874,13 @@ class StateManager:
             session_id: Session ID
             error_message: Error message
         """
-        with self._get_connection() as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE sync_sessions
                 SET completed_at = ?, status = 'failed', error_message = ?
                 WHERE id = ?
             """, (datetime.utcnow().isoformat(), error_message, session_id))
-            conn.commit()
     
     def get_sync_stats(self, service: Optional[str] = None) -> Dict[str, Any]:
         """Get sync statistics.
@@ -330,6 +891,7 @@ class StateManager:
         Returns:
             Dictionary with statistics
         """
+        self.flush()
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
@@ -338,21 +900,16 @@ class StateManager:
                 cursor.execute("SELECT COUNT(*) as count FROM synced_files WHERE service = ?", (service,))
             else:
                 cursor.execute("SELECT COUNT(*) as count FROM synced_files")
-            synced_count = cursor.fetchone()['count']
+            synced_count = cursor.fetchone()[0]
             
-            # Pending uploads
+            # Queued uploads by status, counted in one pass over the queue
             if service:
-                cursor.execute("SELECT COUNT(*) as count FROM upload_queue WHERE service = ? AND status = 'pending'", (service,))
+                cursor.execute("SELECT status, COUNT(*) FROM upload_queue WHERE service = ? GROUP BY status", (service,))
             else:
-                cursor.execute("SELECT COUNT(*) as count FROM upload_queue WHERE status = 'pending'")
-            pending_count = cursor.fetchone()['count']
-            
-            # Failed uploads
-            if service:
-                cursor.execute("SELECT COUNT(*) as count FROM upload_queue WHERE service = ? AND status = 'failed'", (service,))
-            else:
-                cursor.execute("SELECT COUNT(*) as count FROM upload_queue WHERE status = 'failed'")
-            failed_count = cursor.fetchone()['count']
+                cursor.execute("SELECT status, COUNT(*) FROM upload_queue GROUP BY status")
+            queue_counts = dict(cursor.fetchall())
+            pending_count = queue_counts.get('pending', 0) + queue_counts.get('retrying', 0)
+            failed_count = queue_counts.get('failed', 0)
             
             # Recent sessions
             if service:
@@ -366,7 +923,7 @@ class StateManager:
                     SELECT * FROM sync_sessions 
                     ORDER BY started_at DESC LIMIT 5
                 """)
-            recent_sessions = [dict(row) for row in cursor.fetchall()]
+            recent_sessions = self._dict_rows(cursor)
             
             return {
                 'synced_files': synced_count,
@@ -375,6 +932,44 @@ class StateManager:
                 'recent_sessions': recent_sessions
             }
     
+    def get_change_token(self, service: str) -> Optional[str]:
+        """Get the saved incremental sync token for a service.
+        
+        Args:
+            service: Service name
+            
+        Returns:
+            Saved token, or None if the service has never completed a sync
+        """
+        with self._get_connection() as conn:
+            row = conn.execute(
+                "SELECT token FROM change_tokens WHERE service = ?",
+                (service,)
+            ).fetchone()
+            return row[0] if row else None
+    
+    def set_change_token(self, service: str, token: str):
+        """Save the incremental sync token for a service.
+        
+        Args:
+            service: Service name
+            token: Token to resume from on the next sync
+        """
+        with self._transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO change_tokens (service, token, updated_at)
+                VALUES (?, ?, ?)
+            """, (service, token, datetime.utcnow().isoformat()))
+    
+    def clear_change_token(self, service: str):
+        """Forget the incremental sync token so the next sync lists everything.
+        
+        Args:
+            service: Service name
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM change_tokens WHERE service = ?", (service,))
+    
     def set_rate_limit_backoff(self, endpoint: str, backoff_seconds: int):
         """Set a backoff period for rate limiting.
         
@@ -382,17 +977,18 @@ class StateManager:
             endpoint: API endpoint
             backoff_seconds: Seconds to back off
         """
-        backoff_until = datetime.utcnow().timestamp() + backoff_seconds
-        backoff_until_iso = datetime.fromtimestamp(backoff_until).isoformat()
+        backoff_until = time.time() + backoff_seconds
+        backoff_until_iso = datetime.utcfromtimestamp(backoff_until).isoformat()
         
-        with self._get_connection() as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO rate_limit_state
                 (endpoint, backoff_until, last_request_at)
                 VALUES (?, ?, ?)
             """, (endpoint, backoff_until_iso, datetime.utcnow().isoformat()))
-            conn.commit()
+        
+        self._backoff_until[endpoint] = (backoff_until, backoff_until)
     
     def is_rate_limited(self, endpoint: str) -> bool:
         """Check if an endpoint is currently rate limited.
@@ -403,16 +999,25 @@ class StateManager:
         Returns:
             True if rate limited, False otherwise
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT backoff_until FROM rate_limit_state
-                WHERE endpoint = ?
-            """, (endpoint,))
-            
-            row = cursor.fetchone()
-            if not row or not row['backoff_until']:
-                return False
-            
-            backoff_until = datetime.fromisoformat(row['backoff_until'])
-            return datetime.utcnow() < backoff_until
+        now = time.time()
+        backoff_until, next_check = self._backoff_until.get(endpoint, (0.0, 0.0))
+        if now < backoff_until:
+            return True
+        
+        # Another process sharing the database may have set a backoff since
+        if now >= next_check:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT backoff_until FROM rate_limit_state
+                    WHERE endpoint = ?
+                """, (endpoint,))
+                
+                row = cursor.fetchone()
+                backoff_until = (
+                    datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc).timestamp()
+                    if row and row[0] else 0.0
+                )
+            self._backoff_until[endpoint] = (backoff_until, now + RATE_LIMIT_RECHECK_INTERVAL)
+        
+        return now < backoff_until
@@ -0,0 +1,59 @@
+"""
+Tests for the download cache used by queued upload retries.
+
+Run with: python -m pytest
+"""
+
+import os
+
+from download_cache import DownloadCache
+
+
+def _write(data: bytes):
+    def download(dest_path: str):
+        with open(dest_path, 'wb') as dest_file:
+            dest_file.write(data)
+    return download
+
+
+def test_fill_and_open(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), max_bytes=1000)
+    with cache.fill("file1", "abc", _write(b"hello")) as cached:
+        assert cached.read() == b"hello"
+
+    with cache.open("file1", "abc") as cached:
+        assert cached.read() == b"hello"
+    assert cache.open("file1", "changed") is None
+
+
+def test_fill_replaces_stale_copies(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), max_bytes=1000)
+    cache.fill("file1", "old", _write(b"old")).close()
+    cache.fill("file1", "new", _write(b"new")).close()
+
+    assert cache.open("file1", "old") is None
+    assert sorted(os.listdir(tmp_path / "cache")) == ["file1.new.bin"]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), max_bytes=250)
+    for google_id, atime in (("oldest", 1000), ("newer", 2000)):
+        cache.fill(google_id, None, _write(b"x" * 100)).close()
+        os.utime(cache._path(google_id, None), (atime, atime))
+
+    cache.fill("newest", None, _write(b"x" * 100)).close()
+
+    assert cache.open("oldest") is None
+    for google_id in ("newer", "newest"):
+        cached = cache.open(google_id)
+        assert cached is not None
+        cached.close()
+
+
+def test_keeps_an_entry_larger_than_the_cache(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), max_bytes=10)
+    cache.fill("big", None, _write(b"x" * 100)).close()
+
+    cached = cache.open("big")
+    assert cached is not None
+    cached.close()
@@ -0,0 +1,55 @@
+"""
+Tests for the Google Photos download buffers.
+
+Run with: python -m pytest
+"""
+
+import io
+
+from google_photos import BufferPool, PooledBuffer
+
+
+def test_buffer_pool_sizes_small_items_exactly():
+    pool = BufferPool(buffer_size=1024, min_pooled_size=256)
+
+    assert len(pool.acquire(100)) == 100
+    assert len(pool.acquire(512)) == 1024
+    assert len(pool.acquire()) == 1024
+    assert len(pool.acquire(4096)) == 4096
+
+
+def test_buffer_pool_reuses_released_buffers():
+    pool = BufferPool(buffer_size=1024, min_pooled_size=256)
+    buffer = pool.acquire(512)
+    pool.release(buffer)
+    # One-off buffers are not kept
+    pool.release(pool.acquire(100))
+
+    assert pool.acquire(512) is buffer
+    assert pool.acquire(512) is not buffer
+
+
+def test_pooled_buffer_reads_only_the_filled_part():
+    pool = BufferPool(buffer_size=16, min_pooled_size=0)
+    buffer = pool.acquire()
+    buffer[:5] = b"hello"
+    stream = PooledBuffer(buffer, 5, pool)
+
+    assert stream.read(2) == b"he"
+    assert stream.read() == b"llo"
+    stream.seek(0)
+    target = bytearray(8)
+    assert stream.readinto(target) == 5
+    assert bytes(target[:5]) == b"hello"
+    assert stream.seek(0, io.SEEK_END) == 5
+
+
+def test_pooled_buffer_returns_buffer_on_close():
+    pool = BufferPool(buffer_size=16, min_pooled_size=0)
+    buffer = pool.acquire()
+    stream = PooledBuffer(buffer, 0, pool)
+    stream.close()
+    stream.close()
+
+    assert pool.acquire() is buffer
+    assert pool.acquire() is not buffer
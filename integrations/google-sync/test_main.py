@@ -0,0 +1,154 @@
+"""
+Tests for the sync orchestrator's transfer helpers.
+
+Run with: python -m pytest
+"""
+
+import io
+import signal
+import threading
+
+import pytest
+
+import state_manager
+from main import ByteBudget, GoogleSiloSync, prefetch
+from silo_client import UploadResult
+
+
+FILE_INFO = {
+    'name': 'photo.jpg',
+    'mimeType': 'image/jpeg',
+    'size': 5,
+    'baseUrl': 'https://example.com/photo'
+}
+
+
+def test_byte_budget_blocks_until_released():
+    budget = ByteBudget(100)
+    assert budget.acquire(60) == 60
+
+    acquired = threading.Event()
+
+    def take():
+        budget.acquire(60)
+        acquired.set()
+
+    thread = threading.Thread(target=take)
+    thread.start()
+    assert not acquired.wait(0.05)
+
+    budget.release(60)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_byte_budget_clamps_oversized_requests():
+    budget = ByteBudget(100)
+    assert budget.acquire(1000) == 100
+    budget.release(100)
+    assert budget.acquire(0) == 0
+
+
+def test_prefetch_yields_items_in_order():
+    assert list(prefetch(range(1000), buffer_size=10)) == list(range(1000))
+
+
+def test_prefetch_raises_producer_errors():
+    def items():
+        yield 1
+        raise ValueError("listing failed")
+
+    iterator = prefetch(items())
+    assert next(iterator) == 1
+    with pytest.raises(ValueError, match="listing failed"):
+        next(iterator)
+
+
+def test_prefetch_stops_producer_when_closed():
+    closed = threading.Event()
+
+    def items():
+        try:
+            n = 0
+            while True:
+                yield n
+                n += 1
+        finally:
+            closed.set()
+
+    iterator = prefetch(items(), buffer_size=2)
+    assert next(iterator) == 0
+    iterator.close()
+    assert closed.wait(2)
+
+
+class _StubPhotos:
+    """Stands in for GooglePhotosSync, counting downloads."""
+
+    def __init__(self):
+        self.downloads = 0
+
+    def download_media_item(self, media_item):
+        self.downloads += 1
+        return io.BytesIO(b"photo")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sync(tmp_path):
+    """An orchestrator with in-memory state whose uploads and downloads make no requests."""
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    orchestrator = GoogleSiloSync(
+        "http://localhost:5000", "test-bucket", ['photos'],
+        state_db=":memory:", cache_dir=str(tmp_path / "cache"), num_workers=2
+    )
+    orchestrator.photos_client = _StubPhotos()
+    yield orchestrator
+    orchestrator.close()
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def _upload_results(sync, *successes):
+    """Make the orchestrator's uploads succeed or fail in the given order."""
+    results = [
+        UploadResult(success=True, file_id="silo_id") if success
+        else UploadResult(success=False, error_message="Upload failed")
+        for success in successes
+    ]
+    sync.silo_client.upload_file = lambda *args, **kwargs: results.pop(0)
+
+
+def test_failed_queued_upload_retried_after_incremental_sync(sync, monkeypatch):
+    sync.state_manager.add_to_upload_queue("photo_1", "photos", FILE_INFO, "test-bucket")
+    _upload_results(sync, False, True)
+    sync.process_upload_queue()
+
+    # An incremental sync that no longer lists the file
+    session_id = sync.state_manager.start_sync_session("photos")
+    sync.state_manager.complete_sync_session(session_id, {})
+
+    monkeypatch.setattr(state_manager, 'UPLOAD_RETRY_BACKOFF_MINUTES', 0)
+    sync.process_upload_queue()
+
+    assert sync.state_manager.is_file_synced("photo_1", "photos")
+    # The retry reused the download from the failed attempt
+    assert sync.photos_client.downloads == 1
+
+
+def test_cached_download_discarded_when_upload_fails_for_good(sync, monkeypatch):
+    monkeypatch.setattr(state_manager, 'MAX_UPLOAD_ATTEMPTS', 2)
+    monkeypatch.setattr(state_manager, 'UPLOAD_RETRY_BACKOFF_MINUTES', 0)
+    sync.state_manager.add_to_upload_queue("photo_1", "photos", FILE_INFO, "test-bucket")
+    _upload_results(sync, False, False)
+
+    sync.process_upload_queue()
+    cached = sync.download_cache.open("photo_1")
+    assert cached is not None
+    cached.close()
+
+    sync.process_upload_queue()
+    assert sync.state_manager.get_sync_stats("photos")['failed_uploads'] == 1
+    assert sync.download_cache.open("photo_1") is None
@@ -0,0 +1,168 @@
+"""
+Tests for the Silo upload client that make no requests to a server.
+
+Run with: python -m pytest
+"""
+
+import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from email.utils import format_datetime
+
+import pytest
+
+from silo_client import SiloUploadClient, UploadQueue, UploadResult, _InflightLimit, _MultipartBody
+
+
+@pytest.fixture
+def client():
+    return SiloUploadClient(
+        server_url="http://localhost:5000",
+        bucket="test-bucket",
+        max_retries=3
+    )
+
+
+def test_backoff_grows_with_retries(client):
+    assert client._calculate_backoff(0) >= 0.1
+    assert client._calculate_backoff(5) > 1.0
+
+
+def test_rate_limit(client):
+    client._set_rate_limit(5)
+    rate = client._rate
+    assert client._acquire_token() > 4.9
+
+    # Further 429s during the backoff do not slow down again
+    client._set_rate_limit(5)
+    assert client._rate == rate
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 60),
+    ("120", 120),
+    ("0", 0),
+    ("-5", 0),
+    ("soon", 60),
+    ("", 60),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert SiloUploadClient._parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 29 <= SiloUploadClient._parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 31
+
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert SiloUploadClient._parse_retry_after(format_datetime(past, usegmt=True)) == 0
+
+
+def test_multipart_body_framing(client):
+    boundary = "test-boundary"
+    content = bytes(range(256)) * 1000
+    metadata = {'source': 'google_drive', 'path': '/a/b', 'tags': ['skipped']}
+    body = _MultipartBody(
+        client._multipart_head(boundary, 'my "file".txt', 'text/plain', metadata),
+        io.BytesIO(content), len(content), client._multipart_tail(boundary)
+    )
+
+    # Read in small blocks, as requests does
+    data = b''.join(iter(lambda: body.read(4096), b''))
+    assert len(data) == len(body)
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: multipart/form-data; boundary={boundary}\r\n\r\n'.encode() + data
+    )
+    parts = {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+    assert list(parts) == ['source', 'path', 'file']
+    assert parts['source'].get_content() == 'google_drive'
+    assert parts['path'].get_content() == '/a/b'
+    assert parts['file'].get_filename() == 'my %22file%22.txt'
+    assert parts['file'].get_content_type() == 'text/plain'
+    assert parts['file'].get_payload(decode=True) == content
+
+
+def test_inflight_limit_caps_concurrency():
+    limit = _InflightLimit(2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with limit:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+
+
+def test_token_bucket_spaces_requests_after_rate_limit(client):
+    client._set_rate_limit(0)
+    rate = client._rate
+    waits = [client._acquire_token() for _ in range(3)]
+
+    # Each request reserves the slot after the previous one
+    assert waits[1] - waits[0] == pytest.approx(1 / rate, rel=0.1)
+    assert waits[2] - waits[1] == pytest.approx(1 / rate, rel=0.1)
+
+
+def test_stats(client):
+    stats = client.get_stats()
+    assert stats['uploads_attempted'] == 0
+    assert stats['rate_limits_hit'] == 0
+
+
+class _StubClient:
+    """Stands in for SiloUploadClient in UploadQueue tests."""
+
+    def upload_file(self, file_stream, file_name, mime_type, metadata=None):
+        return UploadResult(success=True, file_name=file_name)
+
+    def get_stats(self):
+        return {'rate_limits_hit': 0}
+
+
+def test_upload_queue_join_waits_for_callbacks():
+    upload_queue = UploadQueue(_StubClient(), num_workers=4)
+    upload_queue.start()
+    recorded = []
+    lock = threading.Lock()
+
+    def record(future):
+        time.sleep(0.01)
+        with lock:
+            recorded.append(future.result().file_name)
+
+    for i in range(20):
+        upload_queue.add_upload(io.BytesIO(b"data"), f"file{i}.txt", callback=record)
+    upload_queue.join()
+
+    assert len(recorded) == 20
+    assert not upload_queue._outstanding
+    upload_queue.stop()
+
+
+def test_token_bucket_only_paces_after_rate_limit(client):
+    assert all(client._acquire_token() == 0 for _ in range(1000))
+
+    client._set_rate_limit(1)
+    assert client._acquire_token() > 0.9
+
+    # Recovering to the maximum rate turns pacing off again
+    for _ in range(1000):
+        client._increase_rate()
+    assert client._acquire_token() == 0
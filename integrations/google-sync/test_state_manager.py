@@ -0,0 +1,221 @@
+"""
+Tests for the state manager, run against in-memory SQLite databases.
+
+Run with: python -m pytest
+"""
+
+import threading
+
+import pytest
+
+import state_manager
+from state_manager import StateManager
+
+
+FILE_INFO = {
+    'name': 'test.txt',
+    'mimeType': 'text/plain',
+    'size': 1234,
+    'modifiedTime': '2025-10-08T12:00:00Z'
+}
+
+
+@pytest.fixture
+def state():
+    """A state manager backed by a fresh in-memory database."""
+    manager = StateManager(":memory:")
+    yield manager
+    manager.close()
+
+
+def test_new_file_is_not_synced(state):
+    assert not state.is_file_synced("test_file_123", "drive")
+
+
+def test_mark_file_synced(state):
+    state.mark_file_synced("test_file_123", "drive", FILE_INFO, "silo_id_789", "test-bucket")
+
+    assert state.is_file_synced("test_file_123", "drive")
+    assert not state.is_file_synced("test_file_123", "photos")
+    assert state.get_sync_stats("drive")['synced_files'] == 1
+
+
+def test_upload_queue(state):
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+
+    pending = state.get_pending_uploads()
+    assert [item['google_id'] for item in pending] == ["pending_file_456"]
+    assert pending[0]['file_name'] == 'test.txt'
+    assert state.get_sync_stats("photos")['pending_uploads'] == 1
+
+
+def test_completed_upload_moves_to_synced_files(state):
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+    item = state.get_pending_uploads()[0]
+
+    state.update_upload_status(item['id'], 'completed', silo_file_id="silo_id_789")
+
+    assert state.get_pending_uploads() == []
+    assert state.is_file_synced("pending_file_456", "photos")
+
+
+def test_completed_upload_with_known_key(state):
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+    item = state.get_pending_uploads()[0]
+
+    state.update_upload_status(item['id'], 'completed', silo_file_id="silo_id_789",
+                               google_id="pending_file_456", service="photos")
+    # Already moved: nothing left in the queue to record
+    state.update_upload_status(item['id'], 'completed', silo_file_id="silo_id_789",
+                               google_id="pending_file_456", service="photos")
+
+    assert state.get_pending_uploads() == []
+    assert state.get_sync_stats("photos")['synced_files'] == 1
+
+
+def test_sync_session(state):
+    session_id = state.start_sync_session("drive")
+    state.complete_sync_session(session_id, {
+        'processed': 10,
+        'uploaded': 8,
+        'failed': 2,
+        'bytes_uploaded': 1048576
+    })
+
+    sessions = state.get_sync_stats("drive")['recent_sessions']
+    assert len(sessions) == 1
+    assert sessions[0]['status'] == 'completed'
+    assert sessions[0]['files_uploaded'] == 8
+
+
+def test_state_persists_across_restarts(tmp_path):
+    db_path = str(tmp_path / "state.db")
+
+    state = StateManager(db_path)
+    state.mark_file_synced("test_file_123", "drive", FILE_INFO, "silo_id_789", "test-bucket")
+    state.close()
+
+    state = StateManager(db_path)
+    try:
+        assert state.is_file_synced("test_file_123", "drive")
+    finally:
+        state.close()
+
+
+def test_archive_failed_uploads(state):
+    state.add_to_upload_queue("failed_file_789", "drive", FILE_INFO, "test-bucket")
+    item = state.get_pending_uploads()[0]
+    state.update_upload_status(item['id'], 'failed', error_message="Upload failed")
+
+    assert state.archive_failed_uploads() == 0
+    assert state.archive_failed_uploads(older_than_days=-1) == 1
+    assert state.get_sync_stats("drive")['failed_uploads'] == 0
+
+
+def test_claim_pending_uploads(state):
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+
+    claimed = state.claim_pending_uploads()
+    assert [item['google_id'] for item in claimed] == ["pending_file_456"]
+    assert claimed[0]['status'] == 'uploading'
+    assert state.claim_pending_uploads() == []
+
+
+def test_failed_write_skips_only_the_bad_row(state):
+    # Load the synced ID cache so the batch updates it
+    assert not state.is_file_synced("bad_file", "drive")
+
+    state.mark_files_synced_batch([
+        ("good_file_1", "drive", FILE_INFO, "silo_id_1", "test-bucket"),
+        ("bad_file", "drive", {'name': None}, "silo_id_2", "test-bucket"),
+        ("good_file_2", "drive", FILE_INFO, "silo_id_3", "test-bucket"),
+    ])
+    state.flush()
+
+    assert state.get_sync_stats("drive")['synced_files'] == 2
+    assert state.are_files_synced(["good_file_1", "bad_file"], "drive") == {"good_file_1"}
+
+
+def test_rate_limit_backoff_set_by_another_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_manager, 'RATE_LIMIT_RECHECK_INTERVAL', 0)
+    db_path = str(tmp_path / "state.db")
+    state = StateManager(db_path)
+    other = StateManager(db_path)
+    try:
+        assert not state.is_rate_limited("upload")
+
+        other.set_rate_limit_backoff("upload", 60)
+        assert state.is_rate_limited("upload")
+    finally:
+        other.close()
+        state.close()
+
+
+def test_failed_write_during_first_synced_id_load(state):
+    # The failed write is dropped from the cache while is_file_synced waits
+    # for it to load the cache
+    state.mark_files_synced_batch([
+        ("good_file", "drive", FILE_INFO, "silo_id_1", "test-bucket"),
+        ("bad_file", "drive", {'name': None}, "silo_id_2", "test-bucket"),
+    ])
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(state.are_files_synced(["good_file", "bad_file"], "drive")),
+        daemon=True
+    )
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert results == [{"good_file"}]
+
+
+def test_claims_survive_restart_until_stale(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "state.db")
+    state = StateManager(db_path)
+    other = None
+    try:
+        state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+        assert len(state.claim_pending_uploads()) == 1
+
+        # Another process starting up leaves the live claim alone
+        other = StateManager(db_path)
+        assert other.claim_pending_uploads() == []
+
+        monkeypatch.setattr(state_manager, 'UPLOAD_CLAIM_TIMEOUT_HOURS', -1)
+        assert [item['google_id'] for item in other.claim_pending_uploads()] == ["pending_file_456"]
+    finally:
+        if other:
+            other.close()
+        state.close()
+
+
+def test_release_claimed_uploads(state):
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+    claimed = state.claim_pending_uploads()
+
+    state.release_claimed_uploads(item['id'] for item in claimed)
+
+    pending = state.get_pending_uploads()
+    assert [item['google_id'] for item in pending] == ["pending_file_456"]
+    assert pending[0]['retry_count'] == 0
+
+
+def test_failed_upload_is_retried_after_backoff(state, monkeypatch):
+    monkeypatch.setattr(state_manager, 'MAX_UPLOAD_ATTEMPTS', 2)
+    state.add_to_upload_queue("pending_file_456", "photos", FILE_INFO, "test-bucket")
+    item = state.claim_pending_uploads()[0]
+    assert state.update_upload_status(item['id'], 'retrying', error_message="Upload failed") == 'retrying'
+
+    # Still backing off
+    assert state.claim_pending_uploads() == []
+    assert state.get_sync_stats("photos")['pending_uploads'] == 1
+
+    monkeypatch.setattr(state_manager, 'UPLOAD_RETRY_BACKOFF_MINUTES', 0)
+    item = state.claim_pending_uploads()[0]
+    assert item['retry_count'] == 1
+
+    # Out of attempts
+    assert state.update_upload_status(item['id'], 'retrying', error_message="Upload failed") == 'failed'
+    assert state.claim_pending_uploads() == []
+    assert state.get_sync_stats("photos")['failed_uploads'] == 1